@@ -0,0 +1,112 @@
+"""Move book images to the blob store
+
+Revision ID: 1ebe4c166fcf
+Revises: d7a90e6c21f4
+Create Date: 2026-10-18 16:40:12.508113
+
+"""
+import logging
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from flask import Flask
+from server.exceptions import ConversionError
+from server.util.blob_store import BlobStore, LocalBlobStore
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1ebe4c166fcf'
+down_revision: Union[str, Sequence[str], None] = 'd7a90e6c21f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Books read and rewritten per round trip, so only this many images are held
+# in memory at once
+BATCH_SIZE = 100
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+book = sa.table(
+    "book",
+    sa.column("id", sa.Integer),
+    sa.column("image", sa.String),
+)
+
+
+def blob_store() -> LocalBlobStore:
+    """The store the app writes to, found the way env.py finds the database."""
+    app = Flask("server", instance_relative_config=True)
+    app.config.from_pyfile('config.py', silent=False)
+
+    if app.config["ENVIRONMENT"] == 'testing':
+        app.config.from_object('server.config.TestingConfig')
+    else:
+        app.config.from_object('server.config.Config')
+
+    return LocalBlobStore(BlobStore.root(app.config, app.instance_path))
+
+
+def migrate(condition, convert) -> None:
+    """Rewrite book.image for the rows matching condition, a batch at a time."""
+    connection = op.get_bind()
+    last_id = 0
+
+    while True:
+        rows = connection.execute(
+            sa.select(book.c.id, book.c.image)
+            .where(book.c.id > last_id, condition)
+            .order_by(book.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+
+        if not rows:
+            break
+
+        updates = []
+        for id, image in rows:
+            converted = convert(id, image)
+            if converted is not None:
+                updates.append({"book_id": id, "new_image": converted})
+
+        if updates:
+            connection.execute(
+                book.update()
+                .where(book.c.id == sa.bindparam("book_id"))
+                .values(image=sa.bindparam("new_image")),
+                updates
+            )
+
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    store = blob_store()
+
+    def to_hash(id: int, image: str) -> str | None:
+        try:
+            return store.put(BlobStore.decode_data_url(image))
+        except ConversionError:
+            # Left as it is, to be looked at by hand
+            logger.warning(f"book {id}: image is not a base64 data URL, skipped")
+            return None
+
+    migrate(book.c.image.like("data:%"), to_hash)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The blobs are left in place, a later upgrade finds them again
+    store = blob_store()
+
+    def to_data_url(id: int, image: str) -> str | None:
+        if not store.exists(image):
+            logger.warning(f"book {id}: image {image} is not in the blob store, skipped")
+            return None
+
+        return BlobStore.to_data_url(store.read(image), store.mimetype(image))
+
+    migrate(book.c.image.regexp_match("^[0-9a-f]{64}$"), to_data_url)
@@ -0,0 +1,73 @@
+"""Add indexes for repository filter paths
+
+Revision ID: b3d41f0c9a27
+Revises: 56e905c92343
+Create Date: 2026-10-18 10:12:31.480912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d41f0c9a27'
+down_revision: Union[str, Sequence[str], None] = '56e905c92343'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, partial index predicate)
+indexes = [
+    ("ix_book_transaction_user_id_returned", "book_transaction", ["user_id", "returned"], None),
+    ("ix_book_transaction_book_id", "book_transaction", ["book_id"], None),
+    ("ix_book_transaction_book_id_open", "book_transaction", ["book_id"], "returned = false"),
+    ("ix_book_transaction_due_open", "book_transaction", ["due"], "returned = false"),
+    ("ix_book_return_book_transaction_id", "book_return", ["book_transaction_id"], None),
+    ("ix_fine_user_id_paid", "fine", ["user_id", "paid"], None),
+    ("ix_fine_transaction_id", "fine", ["transaction_id"], None),
+    ("ix_user_account_email_account_type", "user_account", ["email", "account_type"], None),
+    ("ix_user_account_account_type_account_state", "user_account", ["account_type", "account_state"], None),
+]
+
+
+def index_is_valid(name: str) -> bool | None:
+    """Whether the index exists and is usable, None when it does not exist."""
+    return op.get_bind().execute(
+        sa.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name}
+    ).scalar()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in indexes:
+            valid = index_is_valid(name)
+            if valid:
+                continue
+
+            # Left INVALID by a failed or cancelled concurrent build
+            if valid is False:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_where=sa.text(where) if where is not None else None,
+                postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(indexes):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
@@ -0,0 +1,88 @@
+"""Allow one open loan per book
+
+Revision ID: d7a90e6c21f4
+Revises: b3d41f0c9a27
+Create Date: 2026-10-18 11:02:47.215630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a90e6c21f4'
+down_revision: Union[str, Sequence[str], None] = 'b3d41f0c9a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def index_is_valid(name: str) -> bool | None:
+    """Whether the index exists and is usable, None when it does not exist."""
+    return op.get_bind().execute(
+        sa.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name}
+    ).scalar()
+
+
+def create_index_concurrently(name: str, table: str, columns: list[str], **kwargs) -> None:
+    """Build the index unless a valid one is already there.
+
+    A failed or cancelled CREATE INDEX CONCURRENTLY leaves an INVALID index
+    behind under the same name, which is dropped and built again rather than
+    taken as done.
+    """
+    valid = index_is_valid(name)
+    if valid:
+        return
+
+    if valid is False:
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+    op.create_index(name, table, columns, postgresql_concurrently=True, **kwargs)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT book_id FROM book_transaction WHERE returned = false "
+        "GROUP BY book_id HAVING count(*) > 1 ORDER BY book_id LIMIT 20"
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            f"Books {duplicates} have more than one open loan, close the extra "
+            "loans before upgrading"
+        )
+
+    with op.get_context().autocommit_block():
+        create_index_concurrently(
+            "uq_book_transaction_book_id_open",
+            "book_transaction",
+            ["book_id"],
+            unique=True,
+            postgresql_where=sa.text("returned = false")
+        )
+        op.drop_index(
+            "ix_book_transaction_book_id_open",
+            table_name="book_transaction",
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        create_index_concurrently(
+            "ix_book_transaction_book_id_open",
+            "book_transaction",
+            ["book_id"],
+            postgresql_where=sa.text("returned = false")
+        )
+        op.drop_index(
+            "uq_book_transaction_book_id_open",
+            table_name="book_transaction",
+            postgresql_concurrently=True,
+            if_exists=True
+        )
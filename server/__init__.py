@@ -3,18 +3,26 @@ from flask import Flask, g, jsonify
 from flask_cors import CORS
 from server.model.service.notification_service import due_date_reminder
 from server.util.extensions import otp_cache, mailer, forgot_password_cache, new_librarian_cache, scheduler
-from server.exceptions import DatabaseError
+from server.exceptions import DatabaseError, DeadlineExceededError
 from server.model.db import DB
 from server.route.admin import admin
 from server.route.borrower import borrower
 from server.route.librarian import librarian
 from server.route.common_route import common
 from server.model.seed import seed_db
+from server.model import collect_blobs
+from server.util.blob_store import blob_store
+from server.util.compression import compression
+from server.util.deadline import deadline
+from server.util.derivatives import derivatives
+from server.util.serializer import serializer
+from server.util.upload import uploads
 from tests.extensions import test_cache
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.triggers.cron import CronTrigger
+from werkzeug.exceptions import RequestEntityTooLarge
 
-def create_app(env: str = None):
+def create_app(env: str = None, config: dict | None = None):
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_pyfile('config.py', silent=False)
 
@@ -30,12 +38,25 @@ def create_app(env: str = None):
         app.config.from_object('server.config.TestingConfig')
         app.config["CONNECTION_STRING"] = app.config["TEST_CONNECTION_STRING"]
         test_cache.init_app(app)
+
+    if config is not None:
+        app.config.update(config)
         
+    # after_request functions run last registered first, so this one sees
+    # the response once every other handler is done with it
+    compression.init_app(app)
     CORS(
         app,
         supports_credentials=True
     )
+    DB.init_app(app)
+    blob_store.init_app(app)
+    uploads.init_app(app)
+    derivatives.init_app(app)
+    deadline.init_app(app)
+    serializer.init_app(app)
     seed_db.init_app(app)
+    collect_blobs.init_app(app)
     otp_cache.init_app(app)
     forgot_password_cache.init_app(app)
     new_librarian_cache.init_app(app)
@@ -52,6 +73,9 @@ def create_app(env: str = None):
         Session = db.get_sessionmaker()
         g.Session = Session
 
+        if app.config["REQUEST_SCOPED_SESSION"]:
+            db.begin_request()
+
     def due_date_reminder_job():
         with app.app_context():
             due_date_reminder()
@@ -69,6 +93,14 @@ def create_app(env: str = None):
         DatabaseError,
         handle_database_error
     )
+    app.register_error_handler(
+        DeadlineExceededError,
+        handle_deadline_exceeded_error
+    )
+    app.register_error_handler(
+        RequestEntityTooLarge,
+        handle_request_entity_too_large
+    )
    
     gunicorn_logger = logging.getLogger("gunicorn.error")
     app.logger.handlers = gunicorn_logger.handlers
@@ -78,3 +110,9 @@ def create_app(env: str = None):
 
 def handle_database_error(e):
     return jsonify({"error": "Internal server error"}), 500
+
+def handle_deadline_exceeded_error(e):
+    return jsonify({"error": "Request timed out"}), 504
+
+def handle_request_entity_too_large(e):
+    return jsonify({"error": "Request too large"}), 413
\ No newline at end of file
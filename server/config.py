@@ -1,3 +1,5 @@
+import os
+
 from datetime import timedelta
 
 class Config:
@@ -26,12 +28,76 @@ class Config:
 
     PREFERRED_URL_SCHEME = 'http'
 
-    MAX_CONTENT_LENGTH = None
+    # Bodies over MAX_CONTENT_LENGTH are refused with 413 before they are
+    # read. Files in multipart/form-data bodies are streamed to disk and
+    # refused as soon as one passes UPLOAD_MAX_SIZE
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+    UPLOAD_MAX_SIZE = 10 * 1024 * 1024
     MAX_FORM_MEMORY_SIZE = 500_000
     MAX_FORM_PARTS = 1_000
 
     CACHE_DEFAULT_TIMEOUT = 300
 
+    # Book covers are stored by the SHA-256 of their content, under
+    # instance/blobs unless this is set. Their URLs never change content, so
+    # GET /image/<hash> lets clients cache them for IMAGE_MAX_AGE seconds
+    BLOB_STORE_PATH = None
+    IMAGE_MAX_AGE = 31_536_000
+
+    # flask collect-blobs removes covers no book points at, such as those
+    # left by a failed insert, once they are BLOB_COLLECT_AFTER seconds old
+    BLOB_COLLECT_AFTER = 86_400
+
+    # Smaller copies of each cover, fitted into a square of this many pixels,
+    # written as JPEG and WebP under IMAGE_DERIVATIVE_PATH (or the blob
+    # store's derivatives directory) by a pool of IMAGE_DERIVATIVE_WORKERS
+    # threads. They need Pillow, without it every size is the original
+    IMAGE_SIZES = {"thumb": 160, "medium": 480}
+    IMAGE_DERIVATIVE_PATH = None
+    IMAGE_DERIVATIVE_WORKERS = 2
+
+    DB_POOL_SIZE = 5
+    DB_MAX_OVERFLOW = 10
+    DB_POOL_RECYCLE = 1800
+    DB_POOL_PRE_PING = True
+    DB_POOL_TIMEOUT = 30
+
+    # Read-only service methods are spread over these; writes always go to
+    # CONNECTION_STRING. A user's reads stay on the primary for
+    # READ_YOUR_WRITES_SECONDS after they write
+    REPLICA_CONNECTION_STRINGS = []
+    READ_YOUR_WRITES_SECONDS = 5
+
+    # Serialization failures and deadlocks are retried with jittered
+    # exponential backoff, in seconds
+    TRANSACTION_MAX_RETRIES = 3
+    TRANSACTION_RETRY_BACKOFF = 0.02
+    TRANSACTION_RETRY_BACKOFF_MAX = 0.5
+
+    # Share one session and transaction between requires_auth and every
+    # service call of a request, committed once after the view returns
+    REQUEST_SCOPED_SESSION = False
+
+    # List endpoints return at most MAX_PAGE_SIZE rows, whatever limit asks for
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    # Rows fetched per round trip when a list endpoint is asked for stream=true
+    STREAM_BATCH_SIZE = 200
+
+    # Responses of these types are compressed with the encoding the client
+    # rates highest, ties going to the earlier one here. br and zstd are only
+    # offered when brotli and zstandard are installed. Bodies smaller than
+    # COMPRESSION_MIN_SIZE bytes are sent as they are, while streams are
+    # compressed whatever their size
+    COMPRESSION_MIMETYPES = ["application/json"]
+    COMPRESSION_ENCODINGS = ["zstd", "br", "gzip"]
+    COMPRESSION_LEVELS = {"zstd": 3, "br": 4, "gzip": 6}
+    COMPRESSION_MIN_SIZE = 1024
+
+    # "orjson" uses orjson for responses when it is installed, anything else
+    # keeps Flask's default JSON provider
+    JSON_BACKEND = "orjson"
+
     MAIL_SERVER = "smtp.gmail.com"
     MAIL_PORT = 587
     MAIL_USE_TLS = True
@@ -39,6 +105,15 @@ class Config:
     MAIL_DEFAULT_SENDER = "noreply@Qread.com"
     MAIL_MAX_EMAILS = None
     MAIL_ASCII_ATTACHMENTS = False
+    MAIL_TIMEOUT = 10
+
+    # Seconds a request may spend on database and SMTP calls. Blueprints
+    # can override it by name, routes with @deadline.route(seconds)
+    REQUEST_TIMEOUT = 30
+    BLUEPRINT_TIMEOUTS = {
+        "common": 10,
+        "borrower": 10,
+    }
 
 class ProductionConfig(Config):
     SESSION_COOKIE_HTTPONLY = True
@@ -63,5 +138,7 @@ class DevelopmentConfig(Config):
 
 class TestingConfig(Config):
     TESTING = True
+
+    TRANSACTION_RETRY_BACKOFF = 0
     
     MAIL_SUPPRESS_SEND = True
\ No newline at end of file
@@ -20,4 +20,7 @@ class DatabaseError(ServiceError):
     pass
 
 class ConversionError(ServiceError):
+    pass
+
+class DeadlineExceededError(ServiceError):
     pass
\ No newline at end of file
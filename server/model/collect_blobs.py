@@ -0,0 +1,25 @@
+import click
+
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+from server.util.blob_store import blob_store
+from server.util.derivatives import derivatives
+from .db import DB
+from .repository.book_repository import BookRepository
+
+def init_app(app: Flask):
+    app.cli.add_command(collect_blobs_command)
+
+@click.command("collect-blobs")
+@with_appcontext
+def collect_blobs_command():
+    Session = DB.get_db().get_sessionmaker()
+
+    with Session() as session:
+        referenced = BookRepository(session).get_image_hashes()
+
+    removed = blob_store.collect(referenced, current_app.config["BLOB_COLLECT_AFTER"])
+    for digest in removed:
+        derivatives.delete(digest)
+
+    click.echo(f"Removed {len(removed)} unreferenced blobs")
@@ -1,21 +1,170 @@
-from flask import current_app, g
-from sqlalchemy import Engine, create_engine
-from sqlalchemy.orm import sessionmaker
+import os
+import random
+import time
+
+from flask import Flask, Response, current_app, g, has_request_context, jsonify
+from flask import session as user_session
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, sessionmaker
+from server.util.deadline import deadline
+
+# Sends read-only sessions to a replica and everything else to the primary.
+# One replica is picked per session so a transaction never spans two servers
+class RoutingSession(Session):
+    def __init__(self, replicas: list[Engine] | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.replicas = replicas or []
+        self.replica: Engine | None = None
+
+    def get_bind(self, mapper = None, **kwargs):
+        if (
+            self.replicas
+            and self.info.get("read_only")
+            and not DB.pinned_to_primary()
+        ):
+            if self.replica is None:
+                self.replica = random.choice(self.replicas)
+            return self.replica
+
+        return super().get_bind(mapper, **kwargs)
+
+@event.listens_for(RoutingSession, "after_begin")
+def apply_deadline(session: RoutingSession, transaction, connection) -> None:
+    remaining = deadline.remaining()
+
+    # SET LOCAL ends with the transaction, so pooled connections keep the
+    # server default
+    if remaining is not None:
+        connection.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {max(1, int(remaining * 1000))}")
+
+@event.listens_for(RoutingSession, "after_flush")
+def record_write(session: RoutingSession, flush_context) -> None:
+    session.info["wrote"] = True
+
+@event.listens_for(RoutingSession, "after_rollback")
+def forget_write(session: RoutingSession) -> None:
+    session.info.pop("wrote", None)
+
+@event.listens_for(RoutingSession, "after_commit")
+def pin_after_write(session: RoutingSession) -> None:
+    if not session.info.pop("wrote", False):
+        return
+
+    # Replicas lag behind the primary, so the user's next reads go to the
+    # primary until their own writes have had time to replicate
+    if session.replicas and has_request_context():
+        user_session["primary_until"] = (
+            time.time() + current_app.config["READ_YOUR_WRITES_SECONDS"])
 
 class DB:
-    def __init__(self):
-        self.engine = create_engine(current_app.config["CONNECTION_STRING"])
-        self.session = sessionmaker(self.engine)
+    def __init__(self, config):
+        self.engine = DB.create_engine(config, config["CONNECTION_STRING"])
+        self.replica_engines = [
+            DB.create_engine(config, url)
+            for url in config["REPLICA_CONNECTION_STRINGS"]
+        ]
+        self.session = sessionmaker(
+            self.engine,
+            class_ = RoutingSession,
+            replicas = self.replica_engines
+        )
+
+        # Connections inherited from the parent process (e.g. gunicorn
+        # --preload) must not be reused by the forked worker
+        os.register_at_fork(after_in_child=self.dispose_after_fork)
 
     def get_sessionmaker(self) -> sessionmaker:
         return self.session
-    
+
     def get_engine(self) -> Engine:
         return self.engine
-    
+
+    def get_replica_engines(self) -> list[Engine]:
+        return self.replica_engines
+
+    def dispose_after_fork(self) -> None:
+        for engine in (self.engine, *self.replica_engines):
+            engine.dispose(close=False)
+
+    def begin_request(self) -> None:
+        # Nothing is checked out of the pool until the first statement runs
+        session = self.session()
+        session.expire_on_commit = False
+        session.info["rollback_only"] = False
+        g.request_session = session
+
     @staticmethod
-    def get_db():
-        if "db" not in g:
-            g.db = DB()
+    def commit_request(response: Response) -> Response:
+        session: Session | None = g.get("request_session")
+
+        if session is None or not session.in_transaction():
+            return response
+
+        if session.info["rollback_only"]:
+            session.rollback()
+            return response
+
+        try:
+            session.commit()
+        except DBAPIError:
+            session.rollback()
+            current_app.logger.exception("Request unit of work failed to commit")
+            response = jsonify({"error": "Internal server error"})
+            response.status_code = 500
 
-        return g.db
\ No newline at end of file
+        return response
+
+    @staticmethod
+    def close_request(exception: BaseException | None) -> None:
+        session: Session | None = g.pop("request_session", None)
+
+        # Anything not committed by commit_request is rolled back here
+        if session is not None:
+            session.close()
+
+    @staticmethod
+    def create_engine(config, url: str) -> Engine:
+        return create_engine(
+            url,
+            pool_size = config["DB_POOL_SIZE"],
+            max_overflow = config["DB_MAX_OVERFLOW"],
+            pool_recycle = config["DB_POOL_RECYCLE"],
+            pool_pre_ping = config["DB_POOL_PRE_PING"],
+            pool_timeout = config["DB_POOL_TIMEOUT"]
+        )
+
+    @staticmethod
+    def pinned_to_primary() -> bool:
+        if not has_request_context():
+            return False
+
+        return user_session.get("primary_until", 0) > time.time()
+
+    @staticmethod
+    def get_request_session(Session: sessionmaker) -> Session | None:
+        if not has_request_context():
+            return None
+
+        session = g.get("request_session")
+        if session is None or g.get("Session") is not Session:
+            return None
+
+        return session
+
+    @staticmethod
+    def init_app(app: Flask) -> "DB":
+        db = DB(app.config)
+        app.extensions["db"] = db
+
+        # Both do nothing for a request that did not begin a session, so
+        # REQUEST_SCOPED_SESSION is read per request
+        app.after_request(DB.commit_request)
+        app.teardown_request(DB.close_request)
+
+        return db
+
+    @staticmethod
+    def get_db() -> "DB":
+        return current_app.extensions["db"]
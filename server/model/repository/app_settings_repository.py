@@ -1,9 +1,11 @@
 from ..tables import AppSettings, Book, BookCondition
 from .base_repository import BaseRepository
-from sqlalchemy import or_, select, text
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 class AppSettingsRepository(BaseRepository):
+    model = AppSettings
+
     def __init__(self, session: Session):
         super().__init__(session)
     
@@ -11,16 +13,10 @@ class AppSettingsRepository(BaseRepository):
         self, 
         key: str | None
     ) -> list[AppSettings]:
-        stmt = select(AppSettings)
-
-        filters = []
-        if key is not None:
-            filters.append(AppSettings.key.like(f"%{key}%"))
-
-        if filters: 
-            stmt = stmt.where(*filters)
-
-        return self.session.execute(stmt).scalars().all()
+        return self.find(
+            self.spec()
+            .like(AppSettings.key, f"%{key}%" if key is not None else None)
+        )
 
     def insert_setting(
         self, 
@@ -1,5 +1,125 @@
-from sqlalchemy.orm import Session
+from typing import Any, Iterator
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload, subqueryload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+LOADER_STRATEGIES = {
+    "joined": joinedload,
+    "selectin": selectinload,
+    "subquery": subqueryload
+}
+
+# Criteria for a query on one model, built up by chaining and turned into a
+# statement by BaseRepository.find. Criteria given None are skipped, so a
+# repository can pass its optional keyword filters straight through
+class QuerySpec:
+    def __init__(self, model):
+        self.model = model
+        self.filters = []
+        self.ordering = []
+        self.row_limit: int | None = None
+        self.loader_options: list[LoaderOption] = []
+
+    def eq(self, column, value: Any) -> "QuerySpec":
+        if value is not None:
+            self.filters.append(column == value)
+        return self
+
+    def in_(self, column, values: list | None) -> "QuerySpec":
+        if values is not None:
+            self.filters.append(column.in_(values))
+        return self
+
+    def range(self, column, start: Any = None, end: Any = None) -> "QuerySpec":
+        # Half-open, start <= column < end
+        if start is not None:
+            self.filters.append(column >= start)
+        if end is not None:
+            self.filters.append(column < end)
+        return self
+
+    def like(self, column, pattern: str | None) -> "QuerySpec":
+        if pattern is not None:
+            self.filters.append(column.like(pattern))
+        return self
+
+    def where(self, *criteria) -> "QuerySpec":
+        self.filters.extend(criteria)
+        return self
+
+    def order_by(self, *columns) -> "QuerySpec":
+        self.ordering.extend(columns)
+        return self
+
+    def limit(self, limit: int | None) -> "QuerySpec":
+        self.row_limit = limit
+        return self
+
+    def seek(self, after: tuple | None, *columns) -> "QuerySpec":
+        # Keyset predicate for the rows after the sort key of the previous page
+        if after is not None:
+            self.filters.append(tuple_(*columns) > tuple_(*after))
+        return self
+
+    def page(self, after: tuple | None, limit: int | None, *columns) -> "QuerySpec":
+        # Ordering only matters once the result is cut into pages
+        self.seek(after, *columns)
+        if limit is not None:
+            self.order_by(*columns).limit(limit)
+        return self
+
+    def only(self, *columns) -> "QuerySpec":
+        if columns:
+            self.loader_options.append(load_only(*columns))
+        return self
+
+    def options(self, *options: LoaderOption) -> "QuerySpec":
+        self.loader_options.extend(options)
+        return self
+
+    def apply(self, stmt: Select) -> Select:
+        if self.filters:
+            stmt = stmt.where(*self.filters)
+        if self.ordering:
+            stmt = stmt.order_by(*self.ordering)
+        if self.row_limit is not None:
+            stmt = stmt.limit(self.row_limit)
+        if self.loader_options:
+            stmt = stmt.options(*self.loader_options)
+
+        return stmt
+
+    def statement(self) -> Select:
+        return self.apply(select(self.model))
 
 class BaseRepository:
+    model = None
+
     def __init__(self, session: Session):
-        self.session = session
\ No newline at end of file
+        self.session = session
+
+    def spec(self) -> QuerySpec:
+        return QuerySpec(self.model)
+
+    def find(self, spec: QuerySpec) -> list:
+        return self.session.execute(spec.statement()).scalars().all()
+
+    def stream(self, spec: QuerySpec, size: int) -> Iterator[list]:
+        # yield_per reads through a server-side cursor, so only one batch of
+        # size rows is held in memory however large the result is
+        stmt = spec.statement().execution_options(yield_per = size)
+        return self.session.execute(stmt).scalars().partitions()
+
+    @staticmethod
+    def eager(strategy: str, *path) -> LoaderOption:
+        # eager("selectin", Fine.transaction, BookTransaction.book) loads both
+        # hops of the path with the same strategy
+        if strategy not in LOADER_STRATEGIES:
+            raise ValueError(f"Unknown loader strategy {strategy}")
+
+        loader = LOADER_STRATEGIES[strategy]
+        option = loader(path[0])
+        for attribute in path[1:]:
+            option = getattr(option, loader.__name__)(attribute)
+
+        return option
@@ -1,9 +1,13 @@
-from ..tables import Book, BookCondition
-from .base_repository import BaseRepository
-from sqlalchemy import or_, select, text
+from ..tables import Book, BookCondition, BookTransaction, User
+from .base_repository import BaseRepository, QuerySpec
+from sqlalchemy import and_, select, text, update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.interfaces import LoaderOption
+from typing import Iterator
 
 class BookRepository(BaseRepository):
+    model = Book
+
     def __init__(self, session: Session):
         super().__init__(session)
     
@@ -14,45 +18,123 @@ class BookRepository(BaseRepository):
         description: str | None = None, 
         author: str | None = None, 
         condition: BookCondition | None = None, 
-        on_loan: bool | None = None
+        on_loan: bool | None = None,
+        after: tuple[int] | None = None,
+        limit: int | None = None,
+        options: list[LoaderOption] | None = None
     ) -> list[Book]:
-        stmt = select(Book)
-
-        filters = []
-        if id is not None:
-            filters.append(Book.id == id)
-        if title is not None:
-            filters.append(Book.title == title)
-        if description is not None:
-            filters.append(Book.description == description)
-        if author is not None:
-            filters.append(Book.author == author)
-        if condition is not None:
-            filters.append(Book.condition == condition)
-        if on_loan is not None:
-            filters.append(Book.on_loan == on_loan)
-
-        if filters: 
-            stmt = stmt.where(*filters)
+        return self.find(
+            self.book_spec(id, title, description, author, condition, on_loan)
+            .page(after, limit, Book.id)
+            .options(*(options or []))
+        )
 
-        return self.session.execute(stmt).scalars().all()
+    def stream_books(
+        self, 
+        size: int,
+        id: int | None = None, 
+        title: str | None = None, 
+        description: str | None = None, 
+        author: str | None = None, 
+        condition: BookCondition | None = None, 
+        on_loan: bool | None = None,
+        options: list[LoaderOption] | None = None
+    ) -> Iterator[list[Book]]:
+        return self.stream(
+            self.book_spec(id, title, description, author, condition, on_loan)
+            .order_by(Book.id)
+            .options(*(options or [])),
+            size
+        )
 
-    def search_books(
+    def book_spec(
         self, 
-        search: str
+        id: int | None = None, 
+        title: str | None = None, 
+        description: str | None = None, 
+        author: str | None = None, 
+        condition: BookCondition | None = None, 
+        on_loan: bool | None = None
+    ) -> QuerySpec:
+        return (
+            self.spec()
+            .eq(Book.id, id)
+            .eq(Book.title, title)
+            .eq(Book.description, description)
+            .eq(Book.author, author)
+            .eq(Book.condition, condition)
+            .eq(Book.on_loan, on_loan)
+        )
+
+    def get_books_by_ids(
+        self, 
+        ids: list[int],
+        options: list[LoaderOption] | None = None
     ) -> list[Book]:
-        stmt = select(Book)
+        return self.find(
+            self.spec()
+            .in_(Book.id, ids)
+            .order_by(Book.id)
+            .options(*(options or []))
+        )
+
+    def get_books_with_borrower(
+        self, 
+        ids: list[int],
+        options: list[LoaderOption] | None = None
+    ) -> list[tuple[Book, int | None, str | None]]:
+        # A book has at most one open transaction, so this stays one row per
+        # book and needs a single statement however many ids are asked for
+        stmt = (
+            select(Book, BookTransaction.user_id, User.name)
+            .outerjoin(
+                BookTransaction,
+                and_(
+                    BookTransaction.book_id == Book.id,
+                    BookTransaction.returned == False
+                )
+            )
+            .outerjoin(User, BookTransaction.user_id == User.id)
+            .where(Book.id.in_(ids))
+            .order_by(Book.id)
+            .options(*(options or []))
+        )
 
-        filters = []
-        filters.append(Book.title.like(f"%{search}%"))
-        filters.append(or_(Book.description.like(f"%{search}%")))
-        filters.append(or_(Book.author.like(f"%{search}%")))
+        return self.session.execute(stmt).tuples().all()
 
-        if filters: 
-            stmt = stmt.where(*filters)
+    def lock_books(self, ids: list[int]) -> list[int]:
+        # Locking in id order keeps concurrent checkouts from deadlocking
+        stmt = (
+            select(Book.id)
+            .where(Book.id.in_(ids))
+            .order_by(Book.id)
+            .with_for_update()
+        )
 
         return self.session.execute(stmt).scalars().all()
 
+    def checkout_books(self, ids: list[int]) -> list[int]:
+        # Returns the ids that were available and are now on loan
+        stmt = (
+            update(Book)
+            .where(Book.id.in_(ids), Book.on_loan == False)
+            .values(on_loan = True)
+            .returning(Book.id)
+        )
+
+        return self.session.execute(stmt).scalars().all()
+
+    def search_books(
+        self, 
+        search: str
+    ) -> list[Book]:
+        return self.find(
+            self.spec()
+            .like(Book.title, f"%{search}%")
+            .like(Book.description, f"%{search}%")
+            .like(Book.author, f"%{search}%")
+        )
+
 
     def insert_book(self, title: str, description: str, author: str, condition: BookCondition, image: str = None) -> Book:
         book = Book(title = title, description = description, author = author, condition = condition, image = image)
@@ -60,6 +142,11 @@ class BookRepository(BaseRepository):
 
         return book
 
+    def get_image_hashes(self) -> set[str]:
+        stmt = select(Book.image).where(Book.image.is_not(None)).distinct()
+
+        return set(self.session.execute(stmt).scalars())
+
     def delete_book(self, book: Book) -> None:
         self.session.delete(book)  
 
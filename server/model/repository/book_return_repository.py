@@ -1,10 +1,12 @@
 from datetime import datetime
 from ..tables import BookReturn
 from .base_repository import BaseRepository
-from sqlalchemy import select, text
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 class BookReturnRepository(BaseRepository):
+    model = BookReturn
+
     def __init__(self, session: Session):
         super().__init__(session)
     
@@ -15,22 +17,13 @@ class BookReturnRepository(BaseRepository):
         date: datetime | None = None, 
         librarian_id: int | None = None, 
     ) -> list[BookReturn]:
-        stmt = select(BookReturn)
-
-        filters = []
-        if id is not None:
-            filters.append(BookReturn.id == id)
-        if book_transaction_id is not None:
-            filters.append(BookReturn.book_transaction_id == book_transaction_id)
-        if date is not None:
-            filters.append(BookReturn.date == date)
-        if librarian_id is not None:
-            filters.append(BookReturn.librarian_id == librarian_id)
-
-        if filters: 
-            stmt = stmt.where(*filters)
-
-        return self.session.execute(stmt).scalars().all()
+        return self.find(
+            self.spec()
+            .eq(BookReturn.id, id)
+            .eq(BookReturn.book_transaction_id, book_transaction_id)
+            .eq(BookReturn.date, date)
+            .eq(BookReturn.librarian_id, librarian_id)
+        )
 
     def insert_book_return(
         self, 
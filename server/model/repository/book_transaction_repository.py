@@ -1,10 +1,15 @@
 from datetime import datetime
-from ..tables import BookTransaction
+from ..tables import BookTransaction, User
 from .base_repository import BaseRepository
-from sqlalchemy import select, text
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.interfaces import LoaderOption
+from typing import Iterator
 
 class BookTransactionRepository(BaseRepository):
+    model = BookTransaction
+
     def __init__(self, session: Session):
         super().__init__(session)
     
@@ -15,28 +20,65 @@ class BookTransactionRepository(BaseRepository):
         book_id: int | None = None, 
         date: datetime | None = None, 
         due: datetime | None = None, 
-        returned: bool | None = None
+        returned: bool | None = None,
+        options: list[LoaderOption] | None = None,
+        after: tuple[datetime, int] | None = None,
+        limit: int | None = None
     ) -> list[BookTransaction]:
-        stmt = select(BookTransaction)
-
-        filters = []
-        if id is not None:
-            filters.append(BookTransaction.id == id)
-        if user_id is not None:
-            filters.append(BookTransaction.user_id == user_id)
-        if book_id is not None:
-            filters.append(BookTransaction.book_id == book_id)
-        if date is not None:
-            filters.append(BookTransaction.date == date)
-        if due is not None:
-            filters.append(BookTransaction.due == due)
-        if returned is not None:
-            filters.append(BookTransaction.returned == returned)
-
-        if filters: 
-            stmt = stmt.where(*filters)
+        return self.find(
+            self.spec()
+            .eq(BookTransaction.id, id)
+            .eq(BookTransaction.user_id, user_id)
+            .eq(BookTransaction.book_id, book_id)
+            .eq(BookTransaction.date, date)
+            .eq(BookTransaction.due, due)
+            .eq(BookTransaction.returned, returned)
+            .page(after, limit, BookTransaction.date, BookTransaction.id)
+            .options(*(options or []))
+        )
 
-        return self.session.execute(stmt).scalars().all()
+    def stream_transactions(
+        self, 
+        size: int,
+        user_id: int | None = None, 
+        options: list[LoaderOption] | None = None
+    ) -> Iterator[list[BookTransaction]]:
+        return self.stream(
+            self.spec()
+            .eq(BookTransaction.user_id, user_id)
+            .order_by(BookTransaction.date, BookTransaction.id)
+            .options(*(options or [])),
+            size
+        )
+
+    def get_transactions_by_user_ids(
+        self, 
+        user_ids: list[int]
+    ) -> dict[int, list[BookTransaction]]:
+        transactions = self.find(
+            self.spec()
+            .in_(BookTransaction.user_id, user_ids)
+            .order_by(BookTransaction.id)
+        )
+
+        grouped = {user_id: [] for user_id in user_ids}
+        for transaction in transactions:
+            grouped[transaction.user_id].append(transaction)
+
+        return grouped
+
+    def get_transactions_with_user_name(
+        self, 
+        book_ids: list[int]
+    ) -> list[tuple[BookTransaction, str]]:
+        stmt = (
+            select(BookTransaction, User.name)
+            .join(User, BookTransaction.user_id == User.id)
+            .where(BookTransaction.book_id.in_(book_ids))
+            .order_by(BookTransaction.book_id, BookTransaction.id)
+        )
+
+        return self.session.execute(stmt).tuples().all()
 
     def insert_transaction(
         self, 
@@ -48,6 +90,42 @@ class BookTransactionRepository(BaseRepository):
         self.session.add(transaction)
 
         return transaction
+
+    def insert_open_transactions(
+        self, 
+        user_id: int, 
+        book_ids: list[int], 
+        due_date: datetime
+    ) -> list[BookTransaction]:
+        # Books that already have an open loan are skipped
+        stmt = (
+            insert(BookTransaction)
+            .values([
+                {"user_id": user_id, "book_id": book_id, "due": due_date}
+                for book_id in book_ids
+            ])
+            .on_conflict_do_nothing(
+                index_elements = [BookTransaction.book_id],
+                index_where = BookTransaction.returned == False
+            )
+            .returning(BookTransaction)
+        )
+
+        return self.session.execute(stmt).scalars().all()
+
+    def close_open_transaction(self, book_id: int) -> BookTransaction | None:
+        # Returns None if the book has no open loan
+        stmt = (
+            update(BookTransaction)
+            .where(
+                BookTransaction.book_id == book_id,
+                BookTransaction.returned == False
+            )
+            .values(returned = True)
+            .returning(BookTransaction)
+        )
+
+        return self.session.execute(stmt).scalars().first()
     
     def truncate_table(self) -> None:
         self.session.execute(text("TRUNCATE TABLE book_transaction RESTART IDENTITY CASCADE"))
\ No newline at end of file
@@ -3,10 +3,14 @@ import decimal
 
 from ..tables import Fine
 from .base_repository import BaseRepository
-from sqlalchemy import select, text
+from sqlalchemy import text
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.interfaces import LoaderOption
+from typing import Iterator
 
 class FineRepository(BaseRepository):
+    model = Fine
+
     def __init__(self, session: Session):
         super().__init__(session)
     
@@ -18,30 +22,55 @@ class FineRepository(BaseRepository):
         amount: decimal.Decimal | None = None, 
         reason: str | None = None,
         date: datetime | None = None, 
-        paid: bool | None = None
+        paid: bool | None = None,
+        options: list[LoaderOption] | None = None,
+        after: tuple[datetime, int] | None = None,
+        limit: int | None = None
     ) -> list[Fine]:
-        stmt = select(Fine)
+        return self.find(
+            self.spec()
+            .eq(Fine.id, id)
+            .eq(Fine.user_id, user_id)
+            .eq(Fine.transaction_id, transaction_id)
+            .eq(Fine.amount, amount)
+            .eq(Fine.reason, reason)
+            .eq(Fine.date, date)
+            .eq(Fine.paid, paid)
+            .page(after, limit, Fine.date, Fine.id)
+            .options(*(options or []))
+        )
+
+    def stream_fines(
+        self, 
+        size: int,
+        user_id: int | None = None, 
+        paid: bool | None = None,
+        options: list[LoaderOption] | None = None
+    ) -> Iterator[list[Fine]]:
+        return self.stream(
+            self.spec()
+            .eq(Fine.user_id, user_id)
+            .eq(Fine.paid, paid)
+            .order_by(Fine.date, Fine.id)
+            .options(*(options or [])),
+            size
+        )
 
-        filters = []
-        if id is not None:
-            filters.append(Fine.id == id)
-        if user_id is not None:
-            filters.append(Fine.user_id == user_id)
-        if transaction_id is not None:
-            filters.append(Fine.transaction_id == transaction_id)
-        if amount is not None:
-            filters.append(Fine.amount == amount)
-        if reason is not None:
-            filters.append(Fine.reason == reason)
-        if date is not None:
-            filters.append(Fine.date == date)
-        if paid is not None:
-            filters.append(Fine.paid == paid)
+    def get_fines_by_user_ids(
+        self, 
+        user_ids: list[int]
+    ) -> dict[int, list[Fine]]:
+        fines = self.find(
+            self.spec()
+            .in_(Fine.user_id, user_ids)
+            .order_by(Fine.id)
+        )
 
-        if filters: 
-            stmt = stmt.where(*filters)
+        grouped = {user_id: [] for user_id in user_ids}
+        for fine in fines:
+            grouped[fine.user_id].append(fine)
 
-        return self.session.execute(stmt).scalars().all()
+        return grouped
 
     def insert_fine(
         self, 
@@ -1,9 +1,13 @@
-from ..tables import AccountState, User, AccountType
-from .base_repository import BaseRepository
-from sqlalchemy import select, text
+from ..tables import AccountState, BookTransaction, Fine, User, AccountType
+from .base_repository import BaseRepository, QuerySpec
+from sqlalchemy import Row, func, select, text, true
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.interfaces import LoaderOption
+from typing import Iterator
 
 class UserAccountRepository(BaseRepository):
+    model = User
+
     def __init__(self, session: Session):
         super().__init__(session)
     
@@ -13,27 +17,105 @@ class UserAccountRepository(BaseRepository):
         name: str | None = None, 
         email: str | None = None,
         account_type: AccountType | None = None,
-        account_state: AccountState | None = None
+        account_state: AccountState | None = None,
+        after: tuple[int] | None = None,
+        limit: int | None = None,
+        options: list[LoaderOption] | None = None
     ) -> list[User]:
-        stmt = select(User)
+        return self.find(
+            self.user_spec(id, name, email, account_type, account_state)
+            .page(after, limit, User.id)
+            .options(*(options or []))
+        )
 
-        filters = []
-        if id is not None:
-            filters.append(User.id == id)
-        if name is not None:
-            filters.append(User.name == name)
-        if email is not None:
-            filters.append(User.email == email)
-        if account_type is not None:
-            filters.append(User.account_type == account_type)
-        if account_state is not None:
-            filters.append(User.account_state == account_state)
+    def stream_users(
+        self, 
+        size: int,
+        id: int | None = None, 
+        name: str | None = None, 
+        email: str | None = None,
+        account_type: AccountType | None = None,
+        account_state: AccountState | None = None,
+        options: list[LoaderOption] | None = None
+    ) -> Iterator[list[User]]:
+        return self.stream(
+            self.user_spec(id, name, email, account_type, account_state)
+            .order_by(User.id)
+            .options(*(options or [])),
+            size
+        )
+
+    def get_user_summaries(
+        self, 
+        id: int | None = None, 
+        name: str | None = None, 
+        email: str | None = None,
+        account_type: AccountType | None = None,
+        account_state: AccountState | None = None,
+        after: tuple[int] | None = None,
+        limit: int | None = None,
+        options: list[LoaderOption] | None = None
+    ) -> list[Row]:
+        # The page of users is picked first, and each user's loans and fines
+        # are then aggregated on their own, so the work grows with the page
+        # rather than with every loan and fine in the system. Aggregated
+        # separately so they are not multiplied together by the join
+        page = (
+            self.user_spec(id, name, email, account_type, account_state)
+            .page(after, limit, User.id)
+            .apply(select(User.id))
+            .subquery()
+        )
+        loans = (
+            select(
+                func.count().filter(BookTransaction.returned == False).label("open_loans"),
+                func.count().label("total_loans")
+            )
+            .where(BookTransaction.user_id == User.id)
+            .lateral()
+        )
+        fines = (
+            select(
+                func.count().label("unpaid_fines"),
+                func.sum(Fine.amount).label("unpaid_amount")
+            )
+            .where(Fine.user_id == User.id, Fine.paid == False)
+            .lateral()
+        )
 
-        if filters: 
-            stmt = stmt.where(*filters)
+        stmt = (
+            select(
+                User,
+                loans.c.open_loans,
+                loans.c.total_loans,
+                fines.c.unpaid_fines,
+                func.coalesce(fines.c.unpaid_amount, 0).label("unpaid_amount")
+            )
+            .join(page, page.c.id == User.id)
+            .join(loans, true())
+            .join(fines, true())
+            .order_by(User.id)
+        )
+        spec = self.spec().options(*(options or []))
 
-        return self.session.execute(stmt).scalars().all()
+        return self.session.execute(spec.apply(stmt)).all()
 
+    def user_spec(
+        self, 
+        id: int | None = None, 
+        name: str | None = None, 
+        email: str | None = None,
+        account_type: AccountType | None = None,
+        account_state: AccountState | None = None
+    ) -> QuerySpec:
+        return (
+            self.spec()
+            .eq(User.id, id)
+            .eq(User.name, name)
+            .eq(User.email, email)
+            .eq(User.account_type, account_type)
+            .eq(User.account_state, account_state)
+        )
 
     def insert_user(
             self, 
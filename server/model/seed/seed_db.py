@@ -6,9 +6,11 @@ from datetime import datetime, timedelta
 
 from server.model.repository.app_settings_repository import AppSettingsRepository
 from server.model.repository.book_return_repository import BookReturnRepository
+from server.util.blob_store import blob_store
 from server.util.hasher import Hasher
 from ..db import DB
 from flask import Flask
+from flask.cli import with_appcontext
 from .seeds import name, title, description, fine_reason, images, custom_images
 from ..tables import *
 from ..repository.user_account_repository import UserAccountRepository
@@ -27,15 +29,9 @@ def generate_email(name: str) -> str:
     return f"{name.replace(' ', '')}@email.com"
 
 @click.command("seed-db")
+@with_appcontext
 def seed_db_command():
-    app = Flask(__name__, instance_relative_config=True)
-    app.config.from_pyfile('config.py', silent=False)
-
-    if app.config["ENVIRONMENT"] == 'testing':
-        app.config.from_object('server.config.TestingConfig')
-        app.config["CONNECTION_STRING"] = app.config["TEST_CONNECTION_STRING"]
-    
-    db = DB()
+    db = DB.get_db()
     Session = db.get_sessionmaker()
 
     with Session.begin() as session:
@@ -55,6 +51,10 @@ def seed_db_command():
         return_repo.truncate_table()
         settings_repo.truncate_table()
 
+        # Covers go to the blob store, books only keep their hash
+        image_hashes = [blob_store.put_data_url(image) for image in images]
+        custom_image_hashes = [blob_store.put_data_url(image) for image in custom_images]
+
         print("Seeding app settings...")
         settings_repo.insert_setting("reminder_x_days_before_due", "7")
         settings_repo.insert_setting("reminder_every_x_days", "1")
@@ -179,7 +179,7 @@ def seed_db_command():
                 descriptions[n], 
                 author, 
                 BookCondition(condition).name,
-                image=random.choice(images)
+                image=random.choice(image_hashes)
             )
             books.append(book)
 
@@ -190,7 +190,7 @@ def seed_db_command():
             'Finding Audrey is a young adult novel by Sophie Kinsella about a 14-year-old girl named Audrey who suffers from severe social anxiety after a traumatic bullying incident. Unable to leave the house, she wears dark glasses and avoids social contact until her brother\'s friend, Linus, starts to help her re-engage with the world. The book follows her journey toward recovery, exploring themes of mental health, family dynamics, and finding love and courage through humor and a supportive relationship.', 
             'Sophie Kinsella', 
             BookCondition.VERY_GOOD,
-            image=custom_images[0]
+            image=custom_image_hashes[0]
         )
 
         book_repo.insert_book(
@@ -198,7 +198,7 @@ def seed_db_command():
             'Finding Audrey is a young adult novel by Sophie Kinsella about a 14-year-old girl named Audrey who suffers from severe social anxiety after a traumatic bullying incident. Unable to leave the house, she wears dark glasses and avoids social contact until her brother\'s friend, Linus, starts to help her re-engage with the world. The book follows her journey toward recovery, exploring themes of mental health, family dynamics, and finding love and courage through humor and a supportive relationship.', 
             'Sophie Kinsella', 
             BookCondition.VERY_GOOD,
-            image=custom_images[0]
+            image=custom_image_hashes[0]
         )
 
         book_repo.insert_book(
@@ -206,7 +206,7 @@ def seed_db_command():
             'The Japanese Secret to a Long and Happy Life by Héctor García and Francesc Miralles is a book that explores the concept of ikigai, or a reason for being, and how it contributes to a long and fulfilling life. The book examines the habits of people in Okinawa, a Japanese village with one of the world\'s longest-living populations, to provide readers with practical tools to discover their own ikigai.', 
             'Hector Garcia',
             BookCondition.VERY_GOOD,
-            image=custom_images[1]
+            image=custom_image_hashes[1]
         )
 
         book_repo.insert_book(
@@ -214,7 +214,7 @@ def seed_db_command():
             'What Every BODY is Saying by Joe Navarro is a guide to reading nonverbal communication, based on the author\'s experience as an FBI counterintelligence officer. The book explains how to interpret body language to "speed-read" people, decode their true sentiments, avoid deception, and understand hidden motives. It emphasizes that body language is often more revealing than words and provides insights into universal behaviors, including those related to ancient survival instincts.', 
             'Joe Navarro', 
             BookCondition.VERY_GOOD,
-            image=custom_images[2]
+            image=custom_image_hashes[2]
         )
 
         # Seed book transactions and fines
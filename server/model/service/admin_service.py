@@ -6,11 +6,18 @@ from server.model.service.base_service import BaseService
 from server.model.service.transactional_wrapper import transactional
 from server.model.tables import AccountState, AccountType, AppSettings, BookTransaction, Fine, User
 from server.model.repository.user_account_repository import UserAccountRepository
+from flask import current_app
+from sqlalchemy import Row
 from sqlalchemy.exc import NoResultFound
 
 from server.util.hasher import hasher
 from server.util.mailer import mailer
 from server.util.otp import otp
+from server.util.fields import fields
+from server.util.pagination import pagination
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.interfaces import LoaderOption
+from typing import Iterator
 
 class AdminService(BaseService):
     def __init__(self, Session):
@@ -50,52 +57,136 @@ class AdminService(BaseService):
 
         return user
 
-    @transactional
+    @transactional(read_only = True)
     def get_users(
         self, 
         id: int = None, 
         name: str = None,
         email: str = None,
         account_type: AccountType = None,
-        account_state: AccountState = None
-    ) -> list[tuple[
+        account_state: AccountState = None,
+        limit: int | None = None,
+        after: tuple[int] | None = None,
+        user_fields: set[str] | None = None,
+        with_transactions: bool = True,
+        with_fines: bool = True
+    ) -> tuple[list[tuple[
+            User, 
+            list[BookTransaction | None] | None, 
+            list[Fine | None] | None]
+        ], tuple | None]:
+        size = pagination.page_size(limit)
+        users = UserAccountRepository(self.session).get_user(
+            id=id,
+            name=name,
+            email=email,
+            account_type=account_type,
+            account_state=account_state,
+            after=after,
+            limit=size + 1,
+            options=self.load_user(user_fields)
+        )
+
+        if len(users) == 0:
+            raise RecordNotFoundError()
+        
+        users, next = pagination.page(users, size, lambda user: (user.id,))
+
+        return self.load_activity(users, with_transactions, with_fines), next
+
+    @transactional(read_only = True)
+    def stream_users(
+        self, 
+        id: int = None, 
+        name: str = None,
+        email: str = None,
+        account_type: AccountType = None,
+        account_state: AccountState = None,
+        user_fields: set[str] | None = None,
+        with_transactions: bool = True,
+        with_fines: bool = True
+    ) -> Iterator[tuple[
             User, 
             list[BookTransaction | None] | None, 
             list[Fine | None] | None]
         ]:
-        result: list[tuple[
+        batches = UserAccountRepository(self.session).stream_users(
+            current_app.config["STREAM_BATCH_SIZE"],
+            id=id,
+            name=name,
+            email=email,
+            account_type=account_type,
+            account_state=account_state,
+            options=self.load_user(user_fields)
+        )
+
+        for users in batches:
+            yield from self.load_activity(users, with_transactions, with_fines)
+
+    def load_activity(
+        self, 
+        users: list[User], 
+        with_transactions: bool, 
+        with_fines: bool
+    ) -> list[tuple[
             User, 
             list[BookTransaction | None] | None, 
             list[Fine | None] | None]
-        ] = []
+        ]:
+        user_ids = [user.id for user in users]
+        transactions = (
+            BookTransactionRepository(self.session).get_transactions_by_user_ids(user_ids)
+            if with_transactions else {}
+        )
+        fines = (
+            FineRepository(self.session).get_fines_by_user_ids(user_ids)
+            if with_fines else {}
+        )
 
-        users = UserAccountRepository(self.session).get_user(
+        return [
+            (
+                user,
+                transactions.get(user.id) or None, 
+                fines.get(user.id) or None, 
+            )
+            for user in users
+        ]
+    
+    @transactional(read_only = True)
+    def get_user_summaries(
+        self, 
+        id: int = None, 
+        name: str = None,
+        email: str = None,
+        account_type: AccountType = None,
+        account_state: AccountState = None,
+        limit: int | None = None,
+        after: tuple[int] | None = None,
+        user_fields: set[str] | None = None
+    ) -> tuple[list[Row], tuple | None]:
+        size = pagination.page_size(limit)
+        summaries = UserAccountRepository(self.session).get_user_summaries(
             id=id,
             name=name,
             email=email,
             account_type=account_type,
-            account_state=account_state
+            account_state=account_state,
+            after=after,
+            limit=size + 1,
+            options=self.load_user(user_fields)
         )
 
-        if len(users) == 0:
+        if len(summaries) == 0:
             raise RecordNotFoundError()
-        
-        for user in users:
-            transaction = BookTransactionRepository(self.session).get_transactions(
-                user_id = user.id
-            )
 
-            fine = FineRepository(self.session).get_fine(
-                user_id = user.id
-            )
-        
-            result.append((
-                user,
-                transaction if len(transaction) != 0 else None, 
-                fine if len(fine) != 0 else None, 
-            ))
+        return pagination.page(summaries, size, lambda row: (row[0].id,))
+    
+    @staticmethod
+    def load_user(user_fields: set[str] | None) -> list[LoaderOption] | None:
+        if user_fields is None:
+            return None
 
-        return result
+        return [load_only(*fields.columns(User, user_fields))]
     
     @transactional
     def update_user(
@@ -130,7 +221,7 @@ class AdminService(BaseService):
             and user.account_type.name == "ADMIN" 
         ):
             try:
-                emailCheck = self.get_users(email=email)
+                emailCheck, _ = self.get_users(email=email)
 
                 if (len(emailCheck) > 0):
                     raise EmailAlreadyExistsError()
@@ -200,7 +291,7 @@ class AdminService(BaseService):
         users[0].account_state = AccountState.DELETED
         #user_repo.delete_user(users[0])
 
-    @transactional
+    @transactional(read_only = True)
     def get_setting(self, key: str | None) -> list[AppSettings]:
         settings = AppSettingsRepository(self.session).get_setting(key)
         
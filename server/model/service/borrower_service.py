@@ -1,6 +1,5 @@
 from datetime import datetime, timedelta
 from server.exceptions import BookBorrowingError, DatabaseError, EmailAlreadyExistsError, RecordNotFoundError
-from server.model.repository.book_return_repository import BookReturnRepository
 from server.model.repository.fine_repository import FineRepository
 from server.model.service.base_service import BaseService
 from server.model.service.transactional_wrapper import transactional
@@ -9,6 +8,11 @@ from server.model.repository.user_account_repository import UserAccountRepositor
 from server.model.repository.book_repository import BookRepository
 from server.model.repository.book_transaction_repository import BookTransactionRepository
 from server.util.hasher import hasher
+from server.util.fields import fields
+from server.util.pagination import pagination
+from flask import current_app
+from sqlalchemy.orm.interfaces import LoaderOption
+from typing import Iterator
 
 class BorrowerService(BaseService):
     def __init__(self, Session):
@@ -31,72 +35,89 @@ class BorrowerService(BaseService):
         return user
 
     @transactional
-    def borrow_book(self, user_id: int, book_ids: list[int]) -> list[Book]:
+    def borrow_book(self, user_id: int, book_ids: list[int]) -> list[BookTransaction]:
         transaction_repo = BookTransactionRepository(self.session)
         book_repo = BookRepository(self.session)
-        books_borrowed: list[Book] = []
-        
+
+        if len(book_ids) == 0:
+            return []
+
+        seen = set()
         for book_id in book_ids:
+            if book_id in seen:
+                raise BookBorrowingError(book_id)
+            seen.add(book_id)
 
-            # Check if book exist
-            book_check = book_repo.get_book(id=book_id)
+        # Check if books exist, locking them against concurrent checkouts
+        found = set(book_repo.lock_books(book_ids))
 
-            if len(book_check) == 0:
+        for book_id in book_ids:
+            if book_id not in found:
                 raise RecordNotFoundError(book_id)
-            
-            if len(book_check) > 1:
-                raise DatabaseError()
 
-            # Check if book is borrowed
-            if book_check[0].on_loan:
+        # Check if books are borrowed
+        checked_out = set(book_repo.checkout_books(book_ids))
+
+        for book_id in book_ids:
+            if book_id not in checked_out:
                 raise BookBorrowingError(book_id)
-            
-            book = transaction_repo.insert_transaction(
-                user_id = user_id,
-                book_id = book_id,
-                due_date = datetime.now() + timedelta(days=14)
-            )
-            book_check[0].on_loan = True
-            books_borrowed.append(book)
-
-        return books_borrowed
+
+        transactions = transaction_repo.insert_open_transactions(
+            user_id = user_id,
+            book_ids = book_ids,
+            due_date = datetime.now() + timedelta(days=14)
+        )
+
+        # The unique open loan index catches books whose on_loan flag was stale
+        borrowed = {transaction.book_id for transaction in transactions}
+        for book_id in book_ids:
+            if book_id not in borrowed:
+                raise BookBorrowingError(book_id)
+
+        return transactions
     
-    @transactional
-    def get_borrowed_books(self, user_id: int) -> list[tuple[Book, BookTransaction]]:
+    @transactional(read_only = True)
+    def get_borrowed_books(
+        self, 
+        user_id: int, 
+        strategy: str = "joined"
+    ) -> list[tuple[Book, BookTransaction]]:
         transaction_repo = BookTransactionRepository(self.session)
-        book_repo = BookRepository(self.session)
 
         transaction_history = transaction_repo.get_transactions(
             user_id = user_id,
-            returned = False
+            returned = False,
+            options = [transaction_repo.eager(strategy, BookTransaction.book)]
         )
 
         if len(transaction_history) == 0:
             raise RecordNotFoundError()
 
-        result: list[tuple[Book, BookTransaction]] = []
-
-        for transaction in transaction_history:
-            book = book_repo.get_book(id = transaction.book_id)
-
-            if len(book) == 0:
-                raise RecordNotFoundError(transaction.book_id)
-            
-            if len(book) > 1:
-                raise DatabaseError()
-            
-            result.append((book[0], transaction))
-
-        return result
+        return [
+            (transaction.book, transaction) 
+            for transaction in transaction_history
+        ]
     
-    @transactional
-    def get_borrow_history(self, user_id: int) -> list[tuple[Book, BookTransaction, BookReturn | None]]:
+    @transactional(read_only = True)
+    def get_borrow_history(
+        self, 
+        user_id: int, 
+        strategy: str = "joined",
+        limit: int | None = None,
+        after: tuple[datetime, int] | None = None,
+        book_fields: set[str] | None = None
+    ) -> tuple[list[tuple[Book, BookTransaction, BookReturn | None]], tuple | None]:
         transaction_repo = BookTransactionRepository(self.session)
-        book_repo = BookRepository(self.session)
-        return_repo = BookReturnRepository(self.session)
+        size = pagination.page_size(limit)
 
         transaction_history = transaction_repo.get_transactions(
-            user_id = user_id
+            user_id = user_id,
+            options = [
+                self.load_book(transaction_repo.eager(strategy, BookTransaction.book), book_fields),
+                transaction_repo.eager(strategy, BookTransaction.book_return)
+            ],
+            after = after,
+            limit = size + 1
         )
 
         if len(transaction_history) == 0:
@@ -104,67 +125,103 @@ class BorrowerService(BaseService):
                 "type": "transaction_history"
             })
 
-        result: list[tuple[Book, BookTransaction]] = []
+        transaction_history, next = pagination.page(
+            transaction_history, size, lambda transaction: (transaction.date, transaction.id))
+
+        return [self.history_row(transaction) for transaction in transaction_history], next
+
+    @transactional(read_only = True)
+    def stream_borrow_history(
+        self, 
+        user_id: int, 
+        book_fields: set[str] | None = None
+    ) -> Iterator[tuple[Book, BookTransaction, BookReturn | None]]:
+        transaction_repo = BookTransactionRepository(self.session)
 
-        for transaction in transaction_history:
-            book = book_repo.get_book(id = transaction.book_id)
+        # yield_per cannot be combined with loading collections, but both of
+        # these are many-to-one and come back on the same row
+        batches = transaction_repo.stream_transactions(
+            current_app.config["STREAM_BATCH_SIZE"],
+            user_id = user_id,
+            options = [
+                self.load_book(transaction_repo.eager("joined", BookTransaction.book), book_fields),
+                transaction_repo.eager("joined", BookTransaction.book_return)
+            ]
+        )
 
-            if len(book) == 0:
+        for transactions in batches:
+            for transaction in transactions:
+                yield self.history_row(transaction)
+
+    @staticmethod
+    def history_row(transaction: BookTransaction) -> tuple[Book, BookTransaction, BookReturn | None]:
+        return_record = None
+
+        if transaction.returned == True:
+            return_record = transaction.book_return
+
+            if return_record is None:
                 raise RecordNotFoundError({
-                    "type": "book",
-                    "data": transaction.book_id
-                })
-            
-            if len(book) > 1:
-                raise DatabaseError()
-            
-            return_record = None
-
-            if transaction.returned == True:
-                return_record = return_repo.get_book_return(
-                    book_transaction_id = transaction.id
-                )
-
-                if len(return_record) == 0:
-                    raise RecordNotFoundError({
-                    "type": "return",
-                    "data": transaction.id
-                })
-                
-                if len(book) > 1:
-                    raise DatabaseError()
-            
-            result.append((book[0], transaction, return_record))
-
-        return result
+                "type": "return",
+                "data": transaction.id
+            })
+        
+        return transaction.book, transaction, return_record
     
-    @transactional
-    def get_fines(self, user_id: int) -> tuple[list[Fine], list[Book]]:
+    @transactional(read_only = True)
+    def get_fines(
+        self, 
+        user_id: int, 
+        strategy: str = "joined",
+        limit: int | None = None,
+        after: tuple[datetime, int] | None = None,
+        book_fields: set[str] | None = None
+    ) -> tuple[list[Fine], list[Book], tuple | None]:
         fine_repo = FineRepository(self.session)
-        transaction_repo = BookTransactionRepository(self.session)
-        book_repo = BookRepository(self.session)
+        size = pagination.page_size(limit)
 
         fines = fine_repo.get_fine(
-            user_id = user_id, paid = False
+            user_id = user_id, 
+            paid = False,
+            options = [self.load_book(
+                fine_repo.eager(strategy, Fine.transaction, BookTransaction.book), book_fields)],
+            after = after,
+            limit = size + 1
         )
 
         if len(fines) == 0:
             raise RecordNotFoundError()
         
-        transactions: list[BookTransaction] = []
-        for fine in fines:
-            transaction = transaction_repo.get_transactions(
-                id = fine.transaction_id)
-            transactions.append(transaction[0])
-
-        books: list[Book] = []
-        for transaction in transactions:
-            book = book_repo.get_book(
-                id = transaction.book_id
-            )
-            books.append(book[0])
+        fines, next = pagination.page(fines, size, lambda fine: (fine.date, fine.id))
         
-        return fines, books
+        return fines, [fine.transaction.book for fine in fines], next
+
+    @transactional(read_only = True)
+    def stream_fines(
+        self, 
+        user_id: int, 
+        book_fields: set[str] | None = None
+    ) -> Iterator[tuple[Fine, Book]]:
+        fine_repo = FineRepository(self.session)
+
+        batches = fine_repo.stream_fines(
+            current_app.config["STREAM_BATCH_SIZE"],
+            user_id = user_id,
+            paid = False,
+            options = [self.load_book(
+                fine_repo.eager("joined", Fine.transaction, BookTransaction.book), book_fields)]
+        )
+
+        for fines in batches:
+            for fine in fines:
+                yield fine, fine.transaction.book
+    
+    @staticmethod
+    def load_book(option: LoaderOption, book_fields: set[str] | None) -> LoaderOption:
+        if book_fields is None:
+            return option
+
+        return option.load_only(*fields.columns(Book, book_fields))
     
     @transactional
     def pay_fine(self, id: int) -> list[Book]:
@@ -7,7 +7,12 @@ from server.model.repository.user_account_repository import UserAccountRepositor
 from server.model.repository.book_transaction_repository import BookTransactionRepository
 from server.util.mailer import mailer
 from server.util.otp import otp
+from server.util.pagination import pagination
 from server.util.hasher import hasher
+from server.util.fields import fields
+from flask import current_app
+from sqlalchemy.orm import load_only, undefer
+from typing import Iterator
 
 class CommonService(BaseService):
     def __init__(self, Session):
@@ -19,7 +24,8 @@ class CommonService(BaseService):
 
         user = user_repo.get_user(
             email = email, 
-            account_type = account_type
+            account_type = account_type,
+            options = [undefer(User.password)]
         )
         
         if len(user) > 1:
@@ -55,7 +61,7 @@ class CommonService(BaseService):
             )[0]
         return False
 
-    @transactional
+    @transactional(read_only = True)
     def verify(self, id: str, account_type: AccountType) -> bool:
         user_repo = UserAccountRepository(self.session)
 
@@ -67,7 +73,7 @@ class CommonService(BaseService):
         
         return True
     
-    @transactional
+    @transactional(read_only = True)
     def get_book(
         self, 
         id: int | None = None, 
@@ -75,47 +81,126 @@ class CommonService(BaseService):
         description: str | None = None, 
         author: str | None = None, 
         condition: BookCondition | None = None,
-        on_loan: bool | None = None
-    ) -> list:
-        user_repo = UserAccountRepository(self.session)
+        on_loan: bool | None = None,
+        limit: int | None = None,
+        after: tuple[int] | None = None,
+        only: set[str] | None = None
+    ) -> tuple:
+        size = pagination.page_size(limit)
+
+        if only is not None:
+            # on_loan decides whether a book has a current borrower
+            options = [load_only(*fields.columns(Book, only | {"on_loan"}))]
+        else:
+            options = None
+
         books = BookRepository(self.session).get_book(
             id,
             title,
             description,
             author,
             condition,
-            on_loan
+            on_loan,
+            after = after,
+            limit = size + 1,
+            options = options
         )
 
         if len(books) == 0:
             raise RecordNotFoundError()
         
+        books, next = pagination.page(books, size, lambda book: (book.id,))
+        borrowers, transactions = self.load_history(books, only)
+
+        return books, borrowers, transactions, next
+
+    @transactional(read_only = True)
+    def stream_books(
+        self, 
+        id: int | None = None, 
+        title: str | None = None, 
+        description: str | None = None, 
+        author: str | None = None, 
+        condition: BookCondition | None = None,
+        on_loan: bool | None = None,
+        only: set[str] | None = None
+    ) -> Iterator[tuple]:
+        options = (
+            [load_only(*fields.columns(Book, only | {"on_loan"}))] 
+            if only is not None else None
+        )
+
+        batches = BookRepository(self.session).stream_books(
+            current_app.config["STREAM_BATCH_SIZE"],
+            id,
+            title,
+            description,
+            author,
+            condition,
+            on_loan,
+            options = options
+        )
+
+        for books in batches:
+            borrowers, transactions = self.load_history(books, only)
+            yield from zip(books, borrowers, transactions)
+
+    def load_history(self, books: list[Book], only: set[str] | None) -> tuple[list, list]:
+        if only is not None and not only & {"borrower_id", "borrower_name", "transactions"}:
+            return [''] * len(books), [[] for _ in books]
+        
+        # One query for the whole page instead of one per book and per
+        # transaction
+        history = {book.id: [] for book in books}
+        current = {}
+        rows = BookTransactionRepository(self.session).get_transactions_with_user_name(
+            list(history)
+        )
+        for transaction, name in rows:
+            history[transaction.book_id].append([transaction, name])
+            if not transaction.returned:
+                current[transaction.book_id] = [transaction.user_id, name]
+
         borrowers = []
         transactions = []
         for book in books:
-            try:
-                all_transactions = self.get_transaction(book.id, True)
-                current_transactions = []
-
-                for transaction in all_transactions:
-                    user = user_repo.get_user(id=transaction.user_id)[0]
-                    current_transactions.append([transaction, user.name])
-                    
-                transactions.append(current_transactions)
-
-            except RecordNotFoundError:
-                transactions.append([])
+            transactions.append(history[book.id])
             
-            if (book.on_loan):
-                borrowed_by = self.get_transaction(book.id, False)[0]
-                user = user_repo.get_user(id=borrowed_by.user_id)[0]
-                borrowers.append([borrowed_by.user_id, user.name])
+            if book.on_loan and book.id in current:
+                borrowers.append(current[book.id])
             else:
                 borrowers.append('')
 
-        return books, borrowers, transactions
-    
-    @transactional
+        return borrowers, transactions
+
+    @transactional(read_only = True)
+    def get_books_by_ids(self, ids: list[int], only: set[str] | None = None) -> tuple:
+        if only is not None:
+            options = [load_only(*fields.columns(Book, only))]
+        else:
+            options = None
+
+        rows = BookRepository(self.session).get_books_with_borrower(ids, options)
+
+        if len(rows) == 0:
+            raise RecordNotFoundError()
+
+        # Answered in the order the ids were asked for, skipping unknown ones
+        found = {book.id: [book, user_id, name] for book, user_id, name in rows}
+
+        books = []
+        borrowers = []
+        for id in ids:
+            if id not in found:
+                continue
+
+            book, user_id, name = found[id]
+            books.append(book)
+            borrowers.append([user_id, name] if user_id is not None else '')
+
+        return books, borrowers
+
+    @transactional(read_only = True)
     def get_transaction(self, book_id: int, include_returned: bool) -> list:
         if include_returned:
             transactions = BookTransactionRepository(self.session).get_transactions(
@@ -126,9 +211,7 @@ class CommonService(BaseService):
                 book_id=book_id,
                 returned=False
             )
-            if len(transactions) > 1:
-                raise DatabaseError()
-            
+
         if len(transactions) == 0:
             raise RecordNotFoundError()
         
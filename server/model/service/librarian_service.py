@@ -10,6 +10,7 @@ from server.model.service.common_service import CommonService
 from server.model.service.base_service import BaseService
 from server.model.service.transactional_wrapper import transactional
 from server.model.tables import Book, BookCondition, BookReturn, Fine, User
+from server.util.derivatives import derivatives
 from server.util.hasher import hasher
 
 class LibrarianService(BaseService):
@@ -34,10 +35,11 @@ class LibrarianService(BaseService):
     def add_book(self, title: str, description: str, author: str, condition: BookCondition, image: str) -> Book:
         book = BookRepository(self.session).insert_book(
             title, description, author, condition, image)
+        derivatives.submit(image)
         
         return book
     
-    @transactional
+    @transactional(read_only = True)
     def search_books(self, search: str) -> list[Book]:
         books = BookRepository(self.session).search_books(search)
 
@@ -69,16 +71,23 @@ class LibrarianService(BaseService):
     
     @transactional
     def update_book(self, id: int, new_book: Book) -> Book:
-        old_book = BookRepository(self.session).get_book(id)[0]
+        books = BookRepository(self.session).get_book(id)
+
+        if len(books) == 0:
+            raise RecordNotFoundError(id)
+
+        old_book = books[0]
 
         for attr in ("title", "description", "author", "condition", "on_loan", "image"):
             val = getattr(new_book, attr)
             if val is not None:
                 setattr(old_book, attr, val)
+
+        derivatives.submit(new_book.image)
                 
         return old_book
     
-    @transactional
+    @transactional(isolation_level = "REPEATABLE READ")
     def return_book(self, librarian_id: int, book_id: int) -> BookReturn:
         return_repo = BookReturnRepository(self.session)
         transaction_repo = BookTransactionRepository(self.session)
@@ -90,29 +99,17 @@ class LibrarianService(BaseService):
 
         if len(book) == 0:
             raise RecordNotFoundError(book_id)
-        
-        if len(book) > 1:
-            raise DatabaseError()
 
-        transaction = transaction_repo.get_transactions(
-            book_id = book_id,
-            returned = False
-        )
+        # At most one loan can be open, so closing it is a single update
+        transaction = transaction_repo.close_open_transaction(book_id)
 
-        if len(transaction) == 0:
-            raise BookBorrowingError()
-        
-        if len(transaction) > 1:
-            raise DatabaseError()
-        
-        if book[0].on_loan == True:
+        if transaction is None:
             raise BookBorrowingError()
 
         book[0].on_loan = False
-        transaction[0].returned = True
 
         bookreturn = return_repo.insert_book_return(
-            transaction[0].id,
+            transaction.id,
             librarian_id
         )
 
@@ -1,13 +1,11 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
 from flask import current_app
 
 from server.model.db import DB
 from server.model.repository.app_settings_repository import AppSettingsRepository
-from server.model.repository.book_repository import BookRepository
 from server.model.repository.book_transaction_repository import BookTransactionRepository
-from server.model.repository.user_account_repository import UserAccountRepository
 from server.model.tables import BookTransaction
 from server.util.mailer import mailer
 
@@ -22,31 +20,26 @@ def due_date_reminder() -> None:
             transaction_repo = BookTransactionRepository(session)
             settings_repo = AppSettingsRepository(session)
 
-            transactions = transaction_repo.get_transactions(
-                returned = False
-            )
             reminder_before_x = int(settings_repo.get_setting("reminder_x_days_before_due")[0].value)
             reminder_every_x = int(settings_repo.get_setting("reminder_every_x_days")[0].value)
 
             now = datetime.now()
 
-            def send_reminder(transaction: BookTransaction) -> None:
-                user_repo = UserAccountRepository(session)
-                book_repo = BookRepository(session)
-
-                book = book_repo.get_book(id = transaction.book_id)
-                user = user_repo.get_user(id = transaction.user_id)
-
-                if ('@email.com' not in user[0].email):
-                    mailer.send_reminder(user[0].email, book[0], due_in.days)
+            # Only loans due within the reminder window are loaded, together
+            # with their book and borrower
+            transactions = transaction_repo.find(
+                transaction_repo.spec()
+                .eq(BookTransaction.returned, False)
+                .range(BookTransaction.due, now, now + timedelta(days = reminder_before_x + 1))
+                .options(
+                    transaction_repo.eager("joined", BookTransaction.book),
+                    transaction_repo.eager("joined", BookTransaction.user)
+                )
+            )
 
             for transaction in transactions:
                 due_in = transaction.due - now
                 
-                if (due_in.days < 0): continue
-                if (
-                    due_in.days == int(reminder_before_x)
-                    or (due_in.days < reminder_before_x 
-                    and (due_in.days - reminder_before_x) % reminder_every_x == 0) 
-                ):
-                    send_reminder(transaction)
\ No newline at end of file
+                if (due_in.days - reminder_before_x) % reminder_every_x != 0: continue
+                if ('@email.com' not in transaction.user.email):
+                    mailer.send_reminder(transaction.user.email, transaction.book, due_in.days)
\ No newline at end of file
@@ -1,15 +1,216 @@
+import enum
+import random
+import time
+
+from contextvars import ContextVar
 from functools import wraps
-from server.exceptions import DatabaseError
+from inspect import isgeneratorfunction
+from flask import current_app
+from server.exceptions import DatabaseError, DeadlineExceededError, ServiceError
+from server.model.db import DB
+from server.util.metrics import metrics
+from sqlalchemy import text
 from  sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, sessionmaker
+
+class Propagation(enum.Enum):
+    # Join the surrounding transaction, or begin one if there is none
+    REQUIRED = 1
+    # Always run in a transaction of its own, on its own connection
+    REQUIRES_NEW = 2
+    # Run inside a SAVEPOINT of the surrounding transaction
+    NESTED = 3
+
+# serialization_failure and deadlock_detected
+RETRYABLE_SQLSTATES = ("40001", "40P01")
+# query_canceled, raised when statement_timeout fires
+TIMEOUT_SQLSTATE = "57014"
+
+# The (sessionmaker, session) pair of the transaction the current call stack
+# runs in, shared by nested calls on any service instance
+active_transaction: ContextVar[tuple[sessionmaker, Session] | None] = ContextVar(
+    "active_transaction", default=None
+)
+
+def transactional(
+    method = None,
+    *,
+    propagation: Propagation = Propagation.REQUIRED,
+    read_only: bool = False,
+    isolation_level: str | None = None,
+    retries: int | None = None
+):
+    if method is None:
+        return lambda method: transactional(
+            method,
+            propagation = propagation,
+            read_only = read_only,
+            isolation_level = isolation_level,
+            retries = retries
+        )
+
+    if isgeneratorfunction(method):
+        if not read_only:
+            raise ValueError(f"Streaming method {method.__qualname__} must be read only")
+
+        @wraps(method)
+        def stream_wrapper(self, *args, **kwargs):
+            return in_read_only_stream(self, isolation_level, method, *args, **kwargs)
+
+        return stream_wrapper
 
-def transactional(method):
     @wraps(method)
     def wrapper(self, *args, **kwargs):
+        outer_session = getattr(self, "session", None)
+
+        try:
+            if propagation is not Propagation.REQUIRES_NEW:
+                active = active_transaction.get()
+                if (
+                    active is not None
+                    and active[0] is self.Session
+                    # Writes must never be swallowed by a read-only transaction
+                    and (read_only or not active[1].info.get("read_only"))
+                ):
+                    # Database errors of a joined call are left for the
+                    # transaction's owner, which is the only one that can
+                    # retry them
+                    return in_active_session(self, active[1], propagation, method, *args, **kwargs)
+
+                # A method that asks for its own isolation level cannot share
+                # the request's transaction, which has already begun
+                request_session = DB.get_request_session(self.Session)
+                if request_session is not None and isolation_level is None:
+                    try:
+                        return in_request_session(self, request_session, method, *args, **kwargs)
+                    except DBAPIError as e:
+                        raise service_error(e)
+
+            return with_retries(
+                self, method, read_only, isolation_level, retries, *args, **kwargs)
+        finally:
+            self.session = outer_session
+
+    return wrapper
+
+def with_retries(self, method, read_only, isolation_level, retries, *args, **kwargs):
+    config = current_app.config
+    max_retries = config["TRANSACTION_MAX_RETRIES"] if retries is None else retries
+    begin = in_read_only_session if read_only else in_new_session
+    attempt = 0
+
+    while True:
+        try:
+            return begin(self, isolation_level, method, *args, **kwargs)
+        except DBAPIError as e:
+            if getattr(e.orig, "pgcode", None) not in RETRYABLE_SQLSTATES:
+                raise service_error(e)
+
+            if attempt >= max_retries:
+                metrics.increment("transaction_retries_exhausted")
+                raise service_error(e)
+
+            attempt += 1
+            metrics.increment("transaction_retries")
+            metrics.increment(f"transaction_retries.{method.__qualname__}")
+
+            # Full jitter keeps the conflicting requests from retrying in step
+            backoff = min(
+                config["TRANSACTION_RETRY_BACKOFF_MAX"],
+                config["TRANSACTION_RETRY_BACKOFF"] * 2 ** attempt
+            )
+            time.sleep(random.uniform(0, backoff))
+
+def service_error(e: DBAPIError) -> ServiceError:
+    if getattr(e.orig, "pgcode", None) == TIMEOUT_SQLSTATE:
+        return DeadlineExceededError()
+
+    return DatabaseError()
+
+def in_new_session(self, isolation_level, method, *args, **kwargs):
+    with self.Session.begin() as self.session:
+        self.session.expire_on_commit = False
+        if isolation_level is not None:
+            self.session.connection(
+                execution_options = {"isolation_level": isolation_level})
+        token = active_transaction.set((self.Session, self.session))
+
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            active_transaction.reset(token)
+
+def in_read_only_session(self, isolation_level, method, *args, **kwargs):
+    # Without autoflush and a commit the unit of work never flushes, and
+    # closing the session expunges everything before rolling back, so the
+    # returned objects stay loaded
+    with self.Session(autoflush = False) as self.session:
+        self.session.info["read_only"] = True
+        if isolation_level is not None:
+            self.session.connection(
+                execution_options = {"isolation_level": isolation_level})
+        self.session.execute(text("SET TRANSACTION READ ONLY"))
+        token = active_transaction.set((self.Session, self.session))
+
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            active_transaction.reset(token)
+
+def in_read_only_stream(self, isolation_level, method, *args, **kwargs):
+    # The rows are pulled after the view has returned, so a stream never joins
+    # the caller's transaction. It keeps a read-only session of its own open
+    # until it is exhausted or closed, and cannot be retried once it has
+    # yielded anything
+    previous = getattr(self, "session", None)
+
+    with self.Session(autoflush = False) as session:
+        session.info["read_only"] = True
+        if isolation_level is not None:
+            session.connection(
+                execution_options = {"isolation_level": isolation_level})
+
         try:
-            with self.Session.begin() as self.session:
-                self.session.expire_on_commit = False
+            session.execute(text("SET TRANSACTION READ ONLY"))
+            self.session = session
+            yield from method(self, *args, **kwargs)
+        except DBAPIError as e:
+            raise service_error(e)
+        finally:
+            # The service outlives the stream, and must not be left holding
+            # a session that is about to be closed
+            self.session = previous
+
+def in_active_session(self, session, propagation, method, *args, **kwargs):
+    self.session = session
+
+    if propagation is Propagation.NESTED:
+        try:
+            with session.begin_nested():
                 return method(self, *args, **kwargs)
-        except DBAPIError:
-            raise DatabaseError()
-        
-    return wrapper
\ No newline at end of file
+        except DBAPIError as e:
+            # Serialization failures and deadlocks doom the whole transaction,
+            # so only its owner can retry them. Anything else is undone by the
+            # savepoint, and the caller can carry on as after any other call
+            if getattr(e.orig, "pgcode", None) in RETRYABLE_SQLSTATES:
+                raise
+            raise service_error(e)
+
+    return method(self, *args, **kwargs)
+
+def in_request_session(self, session, method, *args, **kwargs):
+    self.session = session
+    token = active_transaction.set((self.Session, session))
+
+    try:
+        result = method(self, *args, **kwargs)
+        # Surface constraint errors here rather than at the final commit
+        session.flush()
+        return result
+    except Exception:
+        # Nested calls join through active_transaction, so this is always the
+        # outermost service call and its failure undoes the request
+        session.info["rollback_only"] = True
+        raise
+    finally:
+        active_transaction.reset(token)
@@ -4,7 +4,7 @@ import re
 
 from typing import List, Optional
 from datetime import datetime
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import ForeignKey, Index, func, inspect, text
 from sqlalchemy.types import TIMESTAMP, NUMERIC
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -31,8 +31,19 @@ class AccountState(enum.Enum):
     DELETED = 3
 
 class Base(DeclarativeBase):
-    def to_dict(self):
-        return {col.name: getattr(self, col.name) for col in self.__table__.columns}
+    def to_dict(self, fields = None):
+        # Deferred columns that were not loaded are left out instead of being
+        # loaded one row at a time. fields limits the dict to those columns
+        state = inspect(self)
+        return {
+            col.name: getattr(self, col.name) 
+            for col in self.__table__.columns
+            if (fields is None or col.name in fields)
+            and not (
+                col.name in state.unloaded 
+                and state.mapper.column_attrs[col.name].deferred
+            )
+        }
     
     @staticmethod
     def str_to_int(str: str) -> int:
@@ -48,13 +59,27 @@ class Base(DeclarativeBase):
         except InvalidOperation:
             raise ConversionError(f"Error converting {str} to Decimal")
 
+    @staticmethod
+    def str_to_bool(str: str) -> bool:
+        if str.lower() == "true":
+            return True
+        if str.lower() == "false":
+            return False
+
+        raise ConversionError(f"Error converting {str} to bool")
+
 class User(Base):
     __tablename__ = "user_account"
+    __table_args__ = (
+        Index("ix_user_account_email_account_type", "email", "account_type"),
+        Index("ix_user_account_account_type_account_state", "account_type", "account_state"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str]
     email: Mapped[str] = mapped_column(unique=True)
-    password: Mapped[str]
+    # Only loaded when asked for with undefer, or on first access
+    password: Mapped[str] = mapped_column(deferred=True)
     account_type: Mapped[AccountType]
     account_state: Mapped[AccountState]
     suspension_reason: Mapped[Optional[str]]
@@ -68,16 +93,17 @@ class User(Base):
             id: {self.id}, 
             name: {self.name}, 
             email: {self.email}, 
-            password: {self.password}, 
             account_type: {self.account_type},
             account_state: {self.account_state},
             suspension_reason: {self.suspension_reason}
         """
     
-    def to_dict(self):
-        dict = super().to_dict()
-        dict["account_type"] = self.account_type.name
-        dict["account_state"] = self.account_state.name
+    def to_dict(self, fields = None):
+        dict = super().to_dict(fields)
+        if "account_type" in dict:
+            dict["account_type"] = self.account_type.name
+        if "account_state" in dict:
+            dict["account_state"] = self.account_state.name
 
         return dict
     
@@ -108,6 +134,7 @@ class Book(Base):
     author: Mapped[str]
     condition: Mapped[BookCondition]
     on_loan: Mapped[bool] = mapped_column(server_default="False")
+    # SHA-256 of the cover in the blob store, served by GET /image/<hash>
     image: Mapped[Optional[str]]
 
     transactions: Mapped[List["BookTransaction"]] = relationship(back_populates="book")
@@ -123,9 +150,10 @@ class Book(Base):
             image: {self.image}
         """
     
-    def to_dict(self):
-        dict = super().to_dict()
-        dict["condition"] = self.condition.name
+    def to_dict(self, fields = None):
+        dict = super().to_dict(fields)
+        if "condition" in dict:
+            dict["condition"] = self.condition.name
 
         return dict
     
@@ -138,6 +166,10 @@ class Book(Base):
 
 class Fine(Base):
     __tablename__ = "fine"
+    __table_args__ = (
+        Index("ix_fine_user_id_paid", "user_id", "paid"),
+        Index("ix_fine_transaction_id", "transaction_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id = mapped_column(ForeignKey("user_account.id"), nullable=False)
@@ -163,6 +195,13 @@ class Fine(Base):
 
 class BookTransaction(Base):
     __tablename__ = "book_transaction"
+    __table_args__ = (
+        Index("ix_book_transaction_user_id_returned", "user_id", "returned"),
+        Index("ix_book_transaction_book_id", "book_id"),
+        # A book can only be on one open loan at a time
+        Index("uq_book_transaction_book_id_open", "book_id", unique=True, postgresql_where=text("returned = false")),
+        Index("ix_book_transaction_due_open", "due", postgresql_where=text("returned = false")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id = mapped_column(ForeignKey("user_account.id"), nullable=False)
@@ -190,6 +229,9 @@ class BookTransaction(Base):
     
 class BookReturn(Base):
     __tablename__ = "book_return"
+    __table_args__ = (
+        Index("ix_book_return_book_transaction_id", "book_transaction_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     book_transaction_id = mapped_column(ForeignKey("book_transaction.id"), nullable=False)
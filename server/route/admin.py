@@ -3,11 +3,30 @@ from flask import Blueprint, g, jsonify, request, session
 from server.exceptions import ConversionError, IncorrectCredentialsError, EmailAlreadyExistsError, RecordNotFoundError
 from server.model.service.admin_service import AdminService
 from server.model.service.common_service import CommonService
-from server.model.tables import AccountType, AppSettings, BookTransaction, Fine, User
+from server.model.tables import AccountState, AccountType, AppSettings, BookTransaction, Fine, User
 from server.route.requires_auth_wrapper import requires_auth
+from server.util.fields import fields
+from server.util.metrics import metrics
+from server.util.pagination import pagination
+from server.util.serializer import serializer
+from server.util.streaming import streaming
 
 admin = Blueprint('admin', __name__, url_prefix="/admin")
 
+USER_COLUMNS = set(User.__table__.columns.keys()) - {"password"}
+USER_FIELDS = {
+    "user": USER_COLUMNS,
+    "transaction": set(BookTransaction.__table__.columns.keys()),
+    "fine": set(Fine.__table__.columns.keys())
+}
+USER_SUMMARY_FIELDS = {
+    "user": USER_COLUMNS,
+    "open_loans": None,
+    "total_loans": None,
+    "unpaid_fines": None,
+    "unpaid_amount": None
+}
+
 @admin.route("/register-librarian", methods=["POST"])
 @requires_auth(AccountType.ADMIN)
 def register_librarian():
@@ -39,6 +58,32 @@ def get_users():
     email = data.get("email") 
     account_type = data.get("type") 
     account_state = data.get("state")
+    view = data.get("view", "full")
+    limit = data.get("limit")
+    cursor = data.get("cursor")
+    only = data.get("fields")
+    stream = data.get("stream")
+
+    if view not in ("full", "summary"):
+        return jsonify({"error": f"Invalid view {view}"}), 400
+
+    try:
+        stream = streaming.parse(stream)
+    except ConversionError:
+        return jsonify({"error": f"Invalid stream {stream}"}), 400
+
+    if stream and view == "summary":
+        return jsonify({"error": "Stream is not supported for the summary view"}), 400
+
+    try:
+        only = fields.parse(only, USER_SUMMARY_FIELDS if view == "summary" else USER_FIELDS)
+    except ConversionError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # The password hash is never part of a response
+    user_fields = fields.section(only, "user")
+    if user_fields is None:
+        user_fields = USER_COLUMNS
 
     if id is not None:
         try:
@@ -65,12 +110,47 @@ def get_users():
             return jsonify({"error": f"Invalid account_state {account_state}"}), 400
 
     try:
-        result = AdminService(g.Session).get_users(
+        limit = pagination.parse_limit(limit)
+    except ConversionError:
+        return jsonify({"error": f"Invalid limit {limit}"}), 400
+
+    try:
+        after = pagination.decode_cursor(cursor, int)
+    except ConversionError:
+        return jsonify({"error": f"Invalid cursor {cursor}"}), 400
+
+    if view == "summary":
+        return get_user_summaries(
+            id, name, email, account_type, account_state, limit, after, only, user_fields)
+
+    if stream:
+        rows = AdminService(g.Session).stream_users(
+            id = id,
+            name = name,
+            email = email,
+            account_type = account_type,
+            account_state = account_state,
+            user_fields = user_fields,
+            with_transactions = only is None or "transaction" in only,
+            with_fines = only is None or "fine" in only
+        )
+
+        return streaming.response("Users retreived", (
+            user_to_dict(row, only, user_fields) for row in rows
+        ))
+
+    try:
+        result, next = AdminService(g.Session).get_users(
             id = id,
             name = name,
             email = email,
             account_type = account_type,
-            account_state = account_state
+            account_state = account_state,
+            limit = limit,
+            after = after,
+            user_fields = user_fields,
+            with_transactions = only is None or "transaction" in only,
+            with_fines = only is None or "fine" in only
         )
     except RecordNotFoundError:
         return jsonify({
@@ -79,34 +159,80 @@ def get_users():
 
     data = []
     for row in result:
-        transactions: list[BookTransaction | None] | None = []
-        if row[1] is not None:
-            for transaction in row[1]:
-                transactions.append(
-                    transaction.to_dict() if transaction is not None else None)
-        else:
-            transactions = None
-
-        fines: list[Fine | None] | None = []
-        if row[2] is not None:
-            for fine in row[2]:
-                fines.append(
-                    fine.to_dict() if fine is not None else None)
-        else:
-            fines = None
-
-        users = row[0].to_dict()
-        del users["password"]
-
-        data.append({
-            "user": users,
-            "transaction": transactions,
-            "fine": fines
-        })
+        data.append(user_to_dict(row, only, user_fields))
+
+    return jsonify({
+        "message": "Users retreived",
+        "data": data,
+        "next": pagination.encode_cursor(next)
+    }), 200
+
+def user_to_dict(row: tuple, only: dict | None, user_fields: set[str]) -> dict:
+    transactions: list[BookTransaction | None] | None = []
+    if row[1] is not None:
+        for transaction in row[1]:
+            transactions.append(
+                serializer.dump(transaction, fields.section(only, "transaction")) 
+                if transaction is not None else None)
+    else:
+        transactions = None
+
+    fines: list[Fine | None] | None = []
+    if row[2] is not None:
+        for fine in row[2]:
+            fines.append(
+                serializer.dump(fine, fields.section(only, "fine")) 
+                if fine is not None else None)
+    else:
+        fines = None
+
+    return fields.pick({
+        "user": serializer.dump(row[0], user_fields),
+        "transaction": transactions,
+        "fine": fines
+    }, only)
+
+def get_user_summaries(
+    id: int | None, 
+    name: str | None, 
+    email: str | None, 
+    account_type: AccountType | None, 
+    account_state: AccountState | None,
+    limit: int | None,
+    after: tuple[int] | None,
+    only: dict | None,
+    user_fields: set[str]
+):
+    try:
+        result, next = AdminService(g.Session).get_user_summaries(
+            id = id,
+            name = name,
+            email = email,
+            account_type = account_type,
+            account_state = account_state,
+            limit = limit,
+            after = after,
+            user_fields = user_fields
+        )
+    except RecordNotFoundError:
+        return jsonify({
+            "message": "No users found"
+        }), 200
+
+    data = []
+    for user, open_loans, total_loans, unpaid_fines, unpaid_amount in result:
+        data.append(fields.pick({
+            "user": serializer.dump(user, user_fields),
+            "open_loans": open_loans,
+            "total_loans": total_loans,
+            "unpaid_fines": unpaid_fines,
+            "unpaid_amount": unpaid_amount
+        }, only))
 
     return jsonify({
         "message": "Users retreived",
-        "data": data
+        "data": data,
+        "next": pagination.encode_cursor(next)
     }), 200
 
 @admin.route("/user", methods=["PUT"])
@@ -291,4 +417,12 @@ def update_app_setting():
     except RecordNotFoundError:
         return jsonify({"error": f"Key {key} not found"}), 404
 
-    return jsonify({"message": f"Setting updated successfully"}), 200
\ No newline at end of file
+    return jsonify({"message": f"Setting updated successfully"}), 200
+
+@admin.route("/metrics", methods=["GET"])
+@requires_auth(AccountType.ADMIN)
+def get_metrics():
+    return jsonify({
+        "message": "Metrics retrieved",
+        "data": metrics.snapshot()
+    }), 200
\ No newline at end of file
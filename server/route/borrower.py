@@ -1,11 +1,26 @@
+from datetime import datetime
 from flask import Blueprint, g, jsonify, request, session
 from server.exceptions import BookBorrowingError, ConversionError, DatabaseError, EmailAlreadyExistsError, RecordNotFoundError
-from server.model.tables import AccountType, Book, Fine, User
+from server.model.tables import AccountType, Book, BookReturn, BookTransaction, Fine, User
 from server.model.service.borrower_service import BorrowerService
 from server.route.requires_auth_wrapper import requires_auth
+from server.util.fields import fields
+from server.util.pagination import pagination
+from server.util.serializer import serializer
+from server.util.streaming import streaming
 
 borrower = Blueprint('borrower', __name__, url_prefix="/borrower")
 
+HISTORY_FIELDS = {
+    "book": set(Book.__table__.columns.keys()),
+    "transaction": set(BookTransaction.__table__.columns.keys()),
+    "return": set(BookReturn.__table__.columns.keys())
+}
+FINE_FIELDS = {
+    "fine": set(Fine.__table__.columns.keys()),
+    "book": set(Book.__table__.columns.keys())
+}
+
 @borrower.route("/register", methods=["POST"])
 def register():
     data = request.json
@@ -70,8 +85,8 @@ def get_borrowed_books():
         "message": "Borrowed book(s) retrieved",
         "data": [
             {
-                "book": book.to_dict(),
-                "transaction:": transaction.to_dict()
+                "book": serializer.dump(book),
+                "transaction:": serializer.dump(transaction)
             }
             for book, transaction in borrowed_books
         ]
@@ -80,9 +95,48 @@ def get_borrowed_books():
 @borrower.route("/borrow-history", methods=["GET"])
 @requires_auth(AccountType.BORROWER)
 def get_borrow_history():
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+    only = request.args.get("fields")
+    stream = request.args.get("stream")
+
+    try:
+        only = fields.parse(only, HISTORY_FIELDS)
+    except ConversionError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        limit = pagination.parse_limit(limit)
+    except ConversionError:
+        return jsonify({"error": f"Invalid limit {limit}"}), 400
+
+    try:
+        after = pagination.decode_cursor(cursor, datetime, int)
+    except ConversionError:
+        return jsonify({"error": f"Invalid cursor {cursor}"}), 400
+
     try:
-        history = BorrowerService(g.Session).get_borrow_history(
-            session["session"]["id"]
+        stream = streaming.parse(stream)
+    except ConversionError:
+        return jsonify({"error": f"Invalid stream {stream}"}), 400
+
+    if stream:
+        rows = BorrowerService(g.Session).stream_borrow_history(
+            session["session"]["id"],
+            book_fields = fields.section(only, "book")
+        )
+
+        return streaming.response("Book history retrieved", (
+            history_to_dict(book, transaction, book_return, only)
+            for book, transaction, book_return in rows
+        ))
+
+    try:
+        history, next = BorrowerService(g.Session).get_borrow_history(
+            session["session"]["id"],
+            limit = limit,
+            after = after,
+            book_fields = fields.section(only, "book")
         )
     except RecordNotFoundError as e:
         if e.args[0].get("type") == "transaction_history":
@@ -93,39 +147,93 @@ def get_borrow_history():
     return jsonify({
         "message": "Book history retrieved",
         "data": [
-            {
-                "book": book.to_dict(),
-                "transaction": transaction.to_dict(),
-                "return": book_return.to_dict() if book_return is not None else None
-            }
+            history_to_dict(book, transaction, book_return, only)
             for book, transaction, book_return in history
-        ]
+        ],
+        "next": pagination.encode_cursor(next)
     }), 200
 
+def history_to_dict(
+    book: Book, 
+    transaction: BookTransaction, 
+    book_return: BookReturn | None, 
+    only: dict | None
+) -> dict:
+    return fields.pick({
+        "book": serializer.dump(book, fields.section(only, "book")),
+        "transaction": serializer.dump(transaction, fields.section(only, "transaction")),
+        "return": (
+            serializer.dump(book_return, fields.section(only, "return")) 
+            if book_return is not None else None
+        )
+    }, only)
+
 @borrower.route("/fines", methods=["GET"])
 @requires_auth(AccountType.BORROWER)
 def get_fines():
     fines: list[Fine] = []
     books: list[Book] = []
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+    only = request.args.get("fields")
+    stream = request.args.get("stream")
 
     try:
-        fines, books = BorrowerService(g.Session).get_fines(
-            session["session"]["id"])
+        only = fields.parse(only, FINE_FIELDS)
+    except ConversionError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        limit = pagination.parse_limit(limit)
+    except ConversionError:
+        return jsonify({"error": f"Invalid limit {limit}"}), 400
+
+    try:
+        after = pagination.decode_cursor(cursor, datetime, int)
+    except ConversionError:
+        return jsonify({"error": f"Invalid cursor {cursor}"}), 400
+
+    try:
+        stream = streaming.parse(stream)
+    except ConversionError:
+        return jsonify({"error": f"Invalid stream {stream}"}), 400
+
+    if stream:
+        rows = BorrowerService(g.Session).stream_fines(
+            session["session"]["id"],
+            book_fields = fields.section(only, "book")
+        )
+
+        return streaming.response("Fine(s) retrieved", (
+            fine_to_dict(fine, book, only) for fine, book in rows
+        ))
+
+    try:
+        fines, books, next = BorrowerService(g.Session).get_fines(
+            session["session"]["id"],
+            limit = limit,
+            after = after,
+            book_fields = fields.section(only, "book")
+        )
     except RecordNotFoundError:
         return jsonify({"message": "No fines found"}), 200
     
     data = []
     for n in range(len(fines)):
-        data.append({
-            "fine": fines[n].to_dict(),
-            "book": books[n].to_dict()
-        })
+        data.append(fine_to_dict(fines[n], books[n], only))
         
     return jsonify({
         "message": "Fine(s) retrieved",
-        "data": data
+        "data": data,
+        "next": pagination.encode_cursor(next)
     }), 200
 
+def fine_to_dict(fine: Fine, book: Book, only: dict | None) -> dict:
+    return fields.pick({
+        "fine": serializer.dump(fine, fields.section(only, "fine")),
+        "book": serializer.dump(book, fields.section(only, "book"))
+    }, only)
+
 @borrower.route("/pay-fine", methods=["POST"])
 @requires_auth(AccountType.BORROWER)
 def pay_fine():
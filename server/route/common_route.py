@@ -1,12 +1,31 @@
-from flask import Blueprint, g, request, session, jsonify
+from flask import Blueprint, current_app, g, request, send_file, session, jsonify
 from server.exceptions import AuthorizationError, ConversionError, EmailAlreadyExistsError, IncorrectCredentialsError, RecordNotFoundError
 from server.model.service.admin_service import AdminService
 from server.model.service.common_service import CommonService
 from server.model.tables import AccountType, Book, User
+from server.util.blob_store import blob_store
+from server.util.deadline import deadline
+from server.util.derivatives import derivatives
+from server.util.fields import fields
+from server.util.pagination import pagination
+from server.util.serializer import serializer
+from server.util.streaming import streaming
 
 
 common = Blueprint('common', __name__)
 
+BOOK_FIELDS = {
+    **{column: None for column in Book.__table__.columns.keys()},
+    "borrower_id": None,
+    "borrower_name": None,
+    "transactions": None
+}
+
+# GET /book?ids= answers from one statement, which leaves out the history
+BOOK_IDS_FIELDS = {
+    name: subfields for name, subfields in BOOK_FIELDS.items() if name != "transactions"
+}
+
 @common.route("/<type>/login", methods=["POST"])
 def login(type: str):
     data = request.json
@@ -67,7 +86,7 @@ def verify_otp():
     session["session"] = session["authenticate"]
     del session["authenticate"]
 
-    data = verification.to_dict()
+    data = serializer.dump(verification)
     data["password"] = None
 
     return jsonify({
@@ -84,6 +103,7 @@ def logout():
     return jsonify({"message": "No active session"}), 200
 
 @common.route("/book", methods=["GET"])
+@deadline.route(5)
 def get_book():
     data = request.args
 
@@ -93,12 +113,40 @@ def get_book():
     author = data.get("author")
     condition = data.get("condition")
     on_loan = data.get("on_loan")
+    limit = data.get("limit")
+    cursor = data.get("cursor")
+    only = data.get("fields")
+    ids = data.get("ids")
+    stream = data.get("stream")
+
+    if ids is not None:
+        return get_books_by_ids(ids, only)
 
     if id is not None:
         try:
             id = Book.str_to_int(id)
         except ConversionError:
             return jsonify({"error": f"Invalid book id {id}"}), 400
+
+    try:
+        only = fields.parse(only, BOOK_FIELDS)
+    except ConversionError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        limit = pagination.parse_limit(limit)
+    except ConversionError:
+        return jsonify({"error": f"Invalid limit {limit}"}), 400
+
+    try:
+        after = pagination.decode_cursor(cursor, int)
+    except ConversionError:
+        return jsonify({"error": f"Invalid cursor {cursor}"}), 400
+
+    try:
+        stream = streaming.parse(stream)
+    except ConversionError:
+        return jsonify({"error": f"Invalid stream {stream}"}), 400
     
     if condition is not None:
         try:
@@ -110,42 +158,152 @@ def get_book():
         if type(on_loan) is not bool:
             return jsonify({"error": f"Invalid on_load {on_loan}"}), 400
 
+    if stream:
+        rows = CommonService(g.Session).stream_books(
+            id,
+            title,
+            description,
+            author,
+            condition,
+            on_loan,
+            set(only) if only is not None else None
+        )
+
+        return streaming.response("Book(s) retrieved", (
+            book_to_dict(book, borrower, history, only) 
+            for book, borrower, history in rows
+        ))
+
     try:
-        books, borrowers, transactions = CommonService(g.Session).get_book(
+        books, borrowers, transactions, next = CommonService(g.Session).get_book(
             id,
             title,
             description,
             author,
             condition,
-            on_loan
+            on_loan,
+            limit,
+            after,
+            set(only) if only is not None else None
         )
     except RecordNotFoundError:
         return jsonify({"message": "No book found"}), 200
     
     data = []
     for n, book in enumerate(books):
-        book_dict = book.to_dict()
+        data.append(book_to_dict(book, borrowers[n], transactions[n], only))
+
+    return jsonify({
+        "message": "Book(s) retrieved",
+        "data": data,
+        "next": pagination.encode_cursor(next)
+    }), 200
+
+def book_to_dict(book: Book, borrower, transactions: list, only: dict | None) -> dict:
+    book_dict = serializer.dump(book, only)
+    
+    if (borrower != '') :
+        book_dict["borrower_id"] = borrower[0]
+        book_dict["borrower_name"] = borrower[1]
+
+    transactions_dict = []
+    for transaction in transactions:
+        if transaction == []: continue
         
-        if (borrowers[n] != '') :
-            book_dict["borrower_id"] = borrowers[n][0]
-            book_dict["borrower_name"] = borrowers[n][1]
+        transaction_dict = serializer.dump(transaction[0])
+        transaction_dict['borrower'] = transaction[1]
+        transactions_dict.append(transaction_dict)
+    book_dict['transactions'] = transactions_dict
+
+    return fields.pick(book_dict, only)
+
+def get_books_by_ids(ids: str, only: str | None):
+    try:
+        book_ids = list(dict.fromkeys(Book.str_to_int(id) for id in ids.split(",")))
+    except ConversionError:
+        return jsonify({"error": f"Invalid book ids {ids}"}), 400
+
+    if len(book_ids) > current_app.config["MAX_PAGE_SIZE"]:
+        return jsonify({"error": f"Too many book ids {len(book_ids)}"}), 400
+
+    try:
+        only = fields.parse(only, BOOK_IDS_FIELDS)
+    except ConversionError as e:
+        return jsonify({"error": str(e)}), 400
 
-        transactions_dict = []
-        for transaction in transactions[n]:
-            if transaction == []: continue
-            
-            transaction_dict = transaction[0].to_dict()
-            transaction_dict['borrower'] = transaction[1]
-            transactions_dict.append(transaction_dict)
-        book_dict['transactions'] = transactions_dict
+    try:
+        books, borrowers = CommonService(g.Session).get_books_by_ids(
+            book_ids,
+            set(only) if only is not None else None
+        )
+    except RecordNotFoundError:
+        return jsonify({"message": "No book found"}), 200
+
+    data = []
+    for book, borrower in zip(books, borrowers):
+        book_dict = serializer.dump(book, only)
 
-        data.append(book_dict)
+        if borrower != '':
+            book_dict["borrower_id"] = borrower[0]
+            book_dict["borrower_name"] = borrower[1]
+
+        data.append(fields.pick(book_dict, only))
 
     return jsonify({
         "message": "Book(s) retrieved",
         "data": data
     }), 200
 
+@common.route("/image/<hash>", methods=["GET"])
+def get_image(hash: str):
+    size = request.args.get("size")
+
+    try:
+        size = derivatives.parse_size(size)
+    except ConversionError:
+        return jsonify({"error": f"Invalid size {size}"}), 400
+
+    if not blob_store.exists(hash):
+        return jsonify({"error": f"Image {hash} not found"}), 404
+
+    if size is not None:
+        variant = None
+        if derivatives.enabled:
+            variant = derivatives.select(hash, size, request.accept_mimetypes)
+
+        if variant is None:
+            # Not resized yet, or resizing is off, so the original stands in
+            # without being cached and the client asks again later
+            response = send_file(blob_store.path(hash), mimetype = blob_store.mimetype(hash))
+            response.cache_control.no_cache = True
+            response.vary.add("Accept")
+
+            return response
+
+        path, mimetype = variant
+        etag = f"{hash}-{size}-{mimetype.split('/')[1]}"
+    else:
+        path, mimetype = blob_store.path(hash), blob_store.mimetype(hash)
+        etag = hash
+
+    # The hash names the content, so the file behind a URL never changes.
+    # send_file answers Range and If-None-Match requests itself
+    response = send_file(
+        path,
+        mimetype = mimetype,
+        conditional = True,
+        etag = etag,
+        max_age = current_app.config["IMAGE_MAX_AGE"]
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+
+    if size is not None:
+        # The same URL is JPEG or WebP depending on what the client accepts
+        response.vary.add("Accept")
+
+    return response
+
 @common.route("/forgot-password", methods=["POST"])
 def forgot_password():
     data = request.json
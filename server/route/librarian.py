@@ -1,13 +1,37 @@
 from flask import Blueprint, g, jsonify, request, session
+from werkzeug.datastructures import FileStorage
 
 from server.exceptions import BookBorrowingError, ConversionError, RecordNotFoundError
 from server.model.service.common_service import CommonService
 from server.model.service.librarian_service import LibrarianService
 from server.model.tables import AccountType, Book, Fine, User
 from server.route.requires_auth_wrapper import requires_auth
+from server.util.blob_store import blob_store
+from server.util.serializer import serializer
+from server.util.upload import uploads
 
 librarian = Blueprint('librarian', __name__, url_prefix="/librarian")
 
+def book_data() -> tuple[dict, str | FileStorage | None]:
+    # A cover comes either as a file in a multipart/form-data body or as a
+    # data URL in a JSON one
+    if request.mimetype == "multipart/form-data":
+        image = request.files.get("image")
+        # Browsers send an empty, unnamed part when no file was picked
+        if image is not None and image.filename == "":
+            image = None
+
+        return request.form, image
+
+    data = request.json
+    return data, data.get("image")
+
+def store_image(image: str | FileStorage) -> str:
+    if isinstance(image, FileStorage):
+        return uploads.store(image)
+
+    return blob_store.put_data_url(image)
+
 @librarian.route("/fine", methods=["POST"])
 @requires_auth(AccountType.LIBRARIAN)
 def issue_fine():
@@ -51,12 +75,11 @@ def issue_fine():
 @librarian.route("/book", methods=["POST"])
 @requires_auth(AccountType.LIBRARIAN)
 def add_book():
-    data = request.json
+    data, image = book_data()
     title = data.get("title")
     description = data.get("description")
     author = data.get("author")
     condition = data.get("condition")
-    image = data.get("image")
     
     if title is None:
         return jsonify({"error": "Missing title field"}), 400
@@ -72,9 +95,15 @@ def add_book():
     except ConversionError as e:
         return jsonify({"error": f"Invalid condition {condition}"}), 400
 
+    if image is not None:
+        try:
+            image = store_image(image)
+        except ConversionError:
+            return jsonify({"error": "Invalid image"}), 400
+
     book = LibrarianService(g.Session).add_book(title, description, author, condition, image)
     
-    return jsonify({"message": "Book added successfully", "data": book.to_dict()}), 200
+    return jsonify({"message": "Book added successfully", "data": serializer.dump(book)}), 200
 
 # @librarian.route("/books", methods=["GET"])
 # @requires_auth(AccountType.LIBRARIAN)
@@ -120,14 +149,13 @@ def remove_book():
 @librarian.route("/book", methods=["PUT"])
 @requires_auth(AccountType.LIBRARIAN)
 def update_book():
-    data = request.json
+    data, book_image = book_data()
     book_id = data.get("id")
     book_title = data.get("title")
     book_description = data.get("description")
     book_author = data.get("author")
     book_condition = data.get("condition")
     book_on_loan = data.get("on_loan")
-    book_image = data.get("image")
 
     if book_id is None:
         return jsonify({"error": "Missing id field"}), 400
@@ -142,6 +170,24 @@ def update_book():
         except ConversionError as e:
             return jsonify({"error": f"Invalid condition {book_condition}"}), 400 
 
+    if isinstance(book_on_loan, str):
+        try:
+            book_on_loan = Book.str_to_bool(book_on_loan)
+        except ConversionError:
+            return jsonify({"error": f"Invalid on_loan {book_on_loan}"}), 400
+
+    if book_image is not None:
+        # Checked first so a cover for an unknown book is never stored
+        try:
+            CommonService(g.Session).get_books_by_ids([book_id], {"id"})
+        except RecordNotFoundError:
+            return jsonify({"error": f"Book {book_id} does not exist"}), 404
+
+        try:
+            book_image = store_image(book_image)
+        except ConversionError:
+            return jsonify({"error": "Invalid image"}), 400
+
     new_book = Book(
         id = book_id,
         title = book_title,
@@ -0,0 +1,212 @@
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+from flask import Flask
+from server.exceptions import ConversionError
+from typing import Iterator
+
+HASH_PATTERN = re.compile("^[0-9a-f]{64}$")
+DATA_URL_PATTERN = re.compile("^data:([^;,]*)(?:;[^;,]*)*;base64,")
+
+# Leading bytes of the image formats covers are uploaded in
+SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+def sniff(head: bytes) -> str:
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+
+    for signature, mimetype in SIGNATURES:
+        if head.startswith(signature):
+            return mimetype
+
+    return "application/octet-stream"
+
+class LocalBlobStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    @property
+    def temp_dir(self) -> str:
+        # Inside the root, so a finished file is renamed into place rather
+        # than copied across file systems
+        return os.path.join(self.root, "tmp")
+
+    def path(self, digest: str) -> str:
+        # Two levels of fan-out keep any one directory small
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.isfile(self.path(digest))
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+
+        # The same content always has the same name, so it is stored once
+        if self.touch(path):
+            return digest
+
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+
+        # Written aside and renamed into place, so a reader never sees half a
+        # file and concurrent writers of the same content cannot clash
+        fd, temp = tempfile.mkstemp(dir = os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+        return digest
+
+    def put_file(self, temp: str, digest: str) -> str:
+        path = self.path(digest)
+
+        if self.touch(path):
+            os.unlink(temp)
+            return digest
+
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        os.replace(temp, path)
+
+        return digest
+
+    def touch(self, path: str) -> bool:
+        # Stored again just now, so collect leaves it alone for another grace
+        # period even though no book points at it yet
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def read(self, digest: str) -> bytes:
+        with open(self.path(digest), "rb") as file:
+            return file.read()
+
+    def digests(self) -> Iterator[str]:
+        # Only the two-character fan-out directories hold blobs, tmp and
+        # anything else kept under the root are skipped
+        for first in self.listdir(self.root):
+            if len(first) != 2:
+                continue
+
+            for second in self.listdir(os.path.join(self.root, first)):
+                for name in self.listdir(os.path.join(self.root, first, second)):
+                    if HASH_PATTERN.match(name):
+                        yield name
+
+    @staticmethod
+    def listdir(path: str) -> list[str]:
+        try:
+            return os.listdir(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+
+    def collect(self, referenced: set[str], older_than: float) -> list[str]:
+        removed = []
+
+        for digest in list(self.digests()):
+            if digest in referenced:
+                continue
+
+            path = self.path(digest)
+            try:
+                if os.path.getmtime(path) > older_than:
+                    continue
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+
+            removed.append(digest)
+
+        # Left by uploads that died before they were renamed into place
+        for name in self.listdir(self.temp_dir):
+            path = os.path.join(self.temp_dir, name)
+            try:
+                if os.path.getmtime(path) <= older_than:
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+        return removed
+
+    def mimetype(self, digest: str) -> str:
+        with open(self.path(digest), "rb") as file:
+            return sniff(file.read(12))
+
+class BlobStore:
+    def __init__(self):
+        self.backend: LocalBlobStore | None = None
+
+    def init_app(self, app: Flask) -> None:
+        self.backend = LocalBlobStore(BlobStore.root(app.config, app.instance_path))
+
+    @staticmethod
+    def root(config, instance_path: str) -> str:
+        return config.get("BLOB_STORE_PATH") or os.path.join(instance_path, "blobs")
+
+    @staticmethod
+    def is_hash(value: str) -> bool:
+        return HASH_PATTERN.match(value) is not None
+
+    @staticmethod
+    def decode_data_url(value: str) -> bytes:
+        match = DATA_URL_PATTERN.match(value)
+        if match is None:
+            raise ConversionError(f"Error converting {value[:32]} to image")
+
+        try:
+            return base64.b64decode(value[match.end():], validate = True)
+        except binascii.Error:
+            raise ConversionError(f"Error converting {value[:32]} to image")
+
+    @staticmethod
+    def to_data_url(data: bytes, mimetype: str) -> str:
+        return f"data:{mimetype};base64,{base64.b64encode(data).decode()}"
+
+    def path(self, digest: str) -> str:
+        return self.backend.path(digest)
+
+    def exists(self, digest: str) -> bool:
+        return self.is_hash(digest) and self.backend.exists(digest)
+
+    def put(self, data: bytes) -> str:
+        return self.backend.put(data)
+
+    def put_file(self, temp: str, digest: str) -> str:
+        return self.backend.put_file(temp, digest)
+
+    @property
+    def temp_dir(self) -> str:
+        return self.backend.temp_dir
+
+    def put_data_url(self, value: str) -> str:
+        return self.backend.put(self.decode_data_url(value))
+
+    def read(self, digest: str) -> bytes:
+        return self.backend.read(digest)
+
+    def collect(self, referenced: set[str], grace: float) -> list[str]:
+        # Covers are written before the book that points at them commits,
+        # and a failed insert or update leaves them behind. Only blobs older
+        # than grace seconds are removed, so one whose book is still being
+        # saved is never taken
+        return self.backend.collect(referenced, time.time() - grace)
+
+    def mimetype(self, digest: str) -> str:
+        return self.backend.mimetype(digest)
+
+blob_store = BlobStore()
@@ -0,0 +1,166 @@
+import time
+import zlib
+
+from flask import Flask, Response, request
+from server.util.metrics import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        # wbits 31 writes the gzip header and trailer around the deflate stream
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush(zlib.Z_FINISH)
+
+class BrotliEncoder:
+    def __init__(self, level: int):
+        self.compressor = brotli.Compressor(quality = level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self.compressor = zstandard.ZstdCompressor(level = level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+class Compression:
+    def __init__(self):
+        self.encoders = {"gzip": GzipEncoder}
+        if brotli is not None:
+            self.encoders["br"] = BrotliEncoder
+        if zstandard is not None:
+            self.encoders["zstd"] = ZstdEncoder
+
+    def init_app(self, app: Flask) -> None:
+        @app.after_request
+        def compress_response(response: Response) -> Response:
+            return self.compress(app, response)
+
+    def negotiate(self, accept_encodings, preference: list[str]) -> str | None:
+        # Highest quality the client gives, ties going to the server's order.
+        # An encoding the client leaves out, or gives q=0, is never used
+        best = None
+        best_quality = 0
+
+        for encoding in preference:
+            if encoding not in self.encoders:
+                continue
+
+            quality = accept_encodings[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+
+        return best
+
+    def compress(self, app: Flask, response: Response) -> Response:
+        config = app.config
+
+        if (
+            response.mimetype not in config["COMPRESSION_MIMETYPES"]
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or response.direct_passthrough
+        ):
+            return response
+
+        # Caches must keep the variants for different Accept-Encoding apart,
+        # including the uncompressed one
+        response.vary.add("Accept-Encoding")
+
+        encoding = self.negotiate(request.accept_encodings, config["COMPRESSION_ENCODINGS"])
+        if encoding is None:
+            return response
+
+        encoder = self.encoders[encoding](config["COMPRESSION_LEVELS"][encoding])
+
+        if response.is_streamed:
+            # Nothing is known about the size of a stream up front, so it is
+            # always compressed, flushing after each chunk to keep it a stream
+            response.response = self.compress_stream(
+                response.response, response.iter_encoded(), encoder, encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < config["COMPRESSION_MIN_SIZE"]:
+                return response
+
+            start = time.thread_time()
+            compressed = encoder.compress(data) + encoder.finish()
+            self.record(encoding, len(data), len(compressed), time.thread_time() - start)
+
+            response.set_data(compressed)
+
+        response.headers["Content-Encoding"] = encoding
+
+        return response
+
+    def compress_stream(self, source, chunks, encoder, encoding: str):
+        size = 0
+        compressed_size = 0
+        seconds = 0
+
+        try:
+            for chunk in chunks:
+                start = time.thread_time()
+                compressed = encoder.compress(chunk) + encoder.flush()
+                seconds += time.thread_time() - start
+
+                size += len(chunk)
+                compressed_size += len(compressed)
+                if compressed:
+                    yield compressed
+
+            start = time.thread_time()
+            compressed = encoder.finish()
+            seconds += time.thread_time() - start
+
+            compressed_size += len(compressed)
+            yield compressed
+
+            self.record(encoding, size, compressed_size, seconds)
+        finally:
+            # Closing the stream early must still close the view's generator
+            if hasattr(source, "close"):
+                source.close()
+
+    def record(self, encoding: str, size: int, compressed_size: int, seconds: float) -> None:
+        metrics.increment(f"compression.responses.{encoding}")
+        metrics.increment("compression.bytes_in", size)
+        metrics.increment("compression.bytes_out", compressed_size)
+        metrics.observe("compression.cpu_seconds", seconds)
+        if size > 0:
+            metrics.observe("compression.ratio", compressed_size / size)
+
+compression = Compression()
@@ -0,0 +1,41 @@
+import time
+
+from functools import wraps
+from flask import Flask, current_app, g, has_request_context, request
+from server.exceptions import DeadlineExceededError
+
+class Deadline:
+    def __init__(self):
+        pass
+
+    def init_app(self, app: Flask) -> None:
+        @app.before_request
+        def start_request_deadline():
+            timeout = app.config["BLUEPRINT_TIMEOUTS"].get(
+                request.blueprint, app.config["REQUEST_TIMEOUT"])
+            self.start(timeout)
+
+    def start(self, seconds: float | None) -> None:
+        g.deadline = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self) -> float | None:
+        if not has_request_context() or g.get("deadline") is None:
+            return None
+
+        remaining = g.deadline - time.monotonic()
+
+        if remaining <= 0:
+            raise DeadlineExceededError()
+
+        return remaining
+
+    def route(self, seconds: float | None):
+        def decorator(method):
+            @wraps(method)
+            def wrapper(*args, **kwargs):
+                self.start(seconds)
+                return method(*args, **kwargs)
+            return wrapper
+        return decorator
+
+deadline = Deadline()
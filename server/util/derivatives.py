@@ -0,0 +1,169 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from flask import Flask
+from server.exceptions import ConversionError
+from server.util.blob_store import BlobStore, blob_store
+from server.util.metrics import metrics
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+class Derivatives:
+    def __init__(self):
+        self.executor: ThreadPoolExecutor | None = None
+        self.root: str | None = None
+        self.sizes: dict[str, int] = {}
+        self.formats: list[str] = []
+        self.logger = None
+        self.lock = threading.Lock()
+        self.pending: set[str] = set()
+
+    def init_app(self, app: Flask) -> None:
+        config = app.config
+
+        self.root = config["IMAGE_DERIVATIVE_PATH"] or os.path.join(
+            BlobStore.root(config, app.instance_path), "derivatives")
+        self.sizes = config["IMAGE_SIZES"]
+        self.logger = app.logger
+
+        if Image is None:
+            app.logger.warning("Pillow is not installed, images are only served at full size")
+            return
+
+        self.formats = ["jpeg"]
+        if features.check("webp"):
+            self.formats.insert(0, "webp")
+
+        # Resizing is CPU bound, so a few workers are enough to keep it off
+        # the request path without starving the request threads
+        self.executor = ThreadPoolExecutor(
+            max_workers = config["IMAGE_DERIVATIVE_WORKERS"],
+            thread_name_prefix = "derivatives"
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.executor is not None
+
+    def path(self, digest: str, size: str, format: str) -> str:
+        return os.path.join(self.root, digest[:2], digest, f"{size}.{format}")
+
+    def failed_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest, "failed")
+
+    def delete(self, digest: str) -> None:
+        shutil.rmtree(os.path.join(self.root, digest[:2], digest), ignore_errors = True)
+
+    def parse_size(self, size: str | None) -> str | None:
+        if size is None or size == "original":
+            return None
+
+        if size not in self.sizes:
+            raise ConversionError(f"Error converting {size} to image size")
+
+        return size
+
+    def submit(self, digest: str | None) -> Future | None:
+        if not self.enabled or digest is None:
+            return None
+
+        # A cover asked for by many clients at once is still resized once,
+        # and one that could not be read is never tried again
+        with self.lock:
+            if digest in self.pending or os.path.exists(self.failed_path(digest)):
+                return None
+            self.pending.add(digest)
+
+        try:
+            return self.executor.submit(self.generate, digest)
+        except BaseException:
+            self.done(digest)
+            raise
+
+    def done(self, digest: str) -> None:
+        with self.lock:
+            self.pending.discard(digest)
+
+    def generate(self, digest: str) -> None:
+        try:
+            missing = [
+                (size, pixels, format)
+                for size, pixels in self.sizes.items()
+                for format in self.formats
+                if not os.path.isfile(self.path(digest, size, format))
+            ]
+            if not missing:
+                return
+
+            with Image.open(blob_store.path(digest)) as image:
+                image.load()
+                image = image.convert("RGB")
+
+            resized = {}
+            for size, pixels, format in missing:
+                if size not in resized:
+                    resized[size] = image.copy()
+                    # Fits the box and keeps the aspect ratio, never scaling up
+                    resized[size].thumbnail((pixels, pixels))
+
+                self.save(resized[size], self.path(digest, size, format), FORMATS[format][0])
+
+            metrics.increment("image_derivatives.generated")
+        except Exception:
+            metrics.increment("image_derivatives.failed")
+            self.logger.exception(f"Generating derivatives of image {digest} failed")
+            self.mark_failed(digest)
+        finally:
+            self.done(digest)
+
+    def mark_failed(self, digest: str) -> None:
+        path = self.failed_path(digest)
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok = True)
+            open(path, "w").close()
+        except OSError:
+            self.logger.exception(f"Could not mark image {digest} as failed")
+
+    def save(self, image, path: str, format: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+
+        fd, temp = tempfile.mkstemp(dir = os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as file:
+                image.save(file, format = format, quality = 80)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    def select(self, digest: str, size: str, accept_mimetypes) -> tuple[str, str] | None:
+        # A client gets WebP only when it names it; */* is not taken as a
+        # promise that it can decode it
+        accepts_webp = any(
+            value == "image/webp" and quality > 0 for value, quality in accept_mimetypes)
+        format = "webp" if accepts_webp and "webp" in self.formats else "jpeg"
+
+        path = self.path(digest, size, format)
+        if os.path.isfile(path):
+            return path, FORMATS[format][1]
+
+        # Covers stored before the pipeline ran are resized on first request,
+        # with the original served until then, or for good if that failed
+        metrics.increment("image_derivatives.misses")
+        self.submit(digest)
+
+        return None
+
+derivatives = Derivatives()
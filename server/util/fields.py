@@ -0,0 +1,66 @@
+from server.exceptions import ConversionError
+
+class Fields:
+    def __init__(self):
+        pass
+
+    def parse(
+        self,
+        value: str | None,
+        allowed: dict[str, set[str] | None]
+    ) -> dict[str, set[str] | None] | None:
+        # "id,title,book.author" gives {"id": None, "title": None, "book": {"author"}}.
+        # allowed maps every top-level field to the names it can be narrowed
+        # to with a dot, or None if it can only be asked for whole
+        if value is None:
+            return None
+
+        selected: dict[str, set[str] | None] = {}
+
+        for field in value.split(","):
+            field = field.strip()
+            name, _, subfield = field.partition(".")
+
+            if name not in allowed:
+                raise ConversionError(f"Invalid field {field}")
+
+            if not subfield:
+                selected[name] = None
+                continue
+
+            if allowed[name] is None or subfield not in allowed[name]:
+                raise ConversionError(f"Invalid field {field}")
+
+            if name not in selected:
+                selected[name] = set()
+            if selected[name] is not None:
+                selected[name].add(subfield)
+
+        return selected
+
+    def section(self, selected: dict | None, name: str) -> set[str] | None:
+        # The fields asked for within one nested object of a response, None
+        # meaning all of them
+        if selected is None:
+            return None
+        if name not in selected:
+            return set()
+
+        return selected[name]
+
+    def columns(self, model, names: set[str] | None) -> list:
+        # The primary key is always loaded so the ORM can identify the rows
+        names = set(model.__table__.columns.keys()) if names is None else names
+        return [
+            getattr(model, column.name)
+            for column in model.__table__.columns
+            if column.name in names or column.primary_key
+        ]
+
+    def pick(self, data: dict, selected: dict | set | None) -> dict:
+        if selected is None:
+            return data
+
+        return {key: value for key, value in data.items() if key in selected}
+
+fields = Fields()
@@ -1,11 +1,43 @@
-from flask_mail import Message
+import smtplib
+
+from flask import current_app
+from flask_mail import Connection, Message
+from server.exceptions import DeadlineExceededError
 from server.model.tables import Book, User
-from server.util.extensions import mailer as mail
+from server.util.deadline import deadline
+
+class DeadlineConnection(Connection):
+    # flask-mail opens its SMTP socket without a timeout, so a hung server
+    # would block the worker forever
+    def configure_host(self) -> smtplib.SMTP | smtplib.SMTP_SSL:
+        timeout = deadline.remaining() or current_app.config["MAIL_TIMEOUT"]
+
+        if self.mail.use_ssl:
+            host = smtplib.SMTP_SSL(self.mail.server, self.mail.port, timeout=timeout)
+        else:
+            host = smtplib.SMTP(self.mail.server, self.mail.port, timeout=timeout)
+
+        host.set_debuglevel(int(self.mail.debug))
+
+        if self.mail.use_tls:
+            host.starttls()
+
+        if self.mail.username and self.mail.password:
+            host.login(self.mail.username, self.mail.password)
+
+        return host
 
 class Mailer:
     def __init__(self):
         pass
 
+    def send(self, msg: Message) -> None:
+        try:
+            with DeadlineConnection(current_app.extensions["mail"]) as connection:
+                connection.send(msg)
+        except TimeoutError:
+            raise DeadlineExceededError()
+
     def send_otp(self, to: str, otp: str) -> None:
         if not User.is_email(to):
             raise ValueError()
@@ -17,7 +49,7 @@ class Mailer:
             body = f"Your OTP is {otp}"
         )
 
-        mail.send(msg)
+        self.send(msg)
 
     def send_forgot_password(self, to: str, secret: str, redirect: str) -> None:
         if not User.is_email(to):
@@ -30,7 +62,7 @@ class Mailer:
             body = f"Reset your password: {redirect}?secret={secret}"
         )
 
-        mail.send(msg)
+        self.send(msg)
 
     def send_new_librarian(self, to: str, secret: str, redirect: str) -> None:
         if not User.is_email(to):
@@ -43,7 +75,7 @@ class Mailer:
             body = f"Create new librarian account: {redirect}?secret={secret}"
         )
 
-        mail.send(msg)
+        self.send(msg)
 
     def send_reminder(self, to: str, book: Book, days_left: int) -> None:
         if not User.is_email(to):
@@ -56,6 +88,6 @@ class Mailer:
             body = f"Reminder: Your book {book.title} will be due in {days_left} day(s)."
         )
 
-        mail.send(msg)
+        self.send(msg)
         
 mailer = Mailer()
\ No newline at end of file
@@ -0,0 +1,39 @@
+import threading
+
+from collections import defaultdict
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: dict[str, float] = defaultdict(float)
+        self.observations: dict[str, dict[str, float]] = {}
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self.lock:
+            self.counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        with self.lock:
+            summary = self.observations.get(name)
+
+            if summary is None:
+                self.observations[name] = {
+                    "count": 1, "sum": value, "min": value, "max": value}
+                return
+
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["min"] = min(summary["min"], value)
+            summary["max"] = max(summary["max"], value)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "observations": {
+                    name: dict(summary)
+                    for name, summary in self.observations.items()
+                }
+            }
+
+metrics = Metrics()
@@ -0,0 +1,74 @@
+import base64
+import binascii
+import json
+
+from datetime import datetime
+from flask import current_app
+from server.exceptions import ConversionError
+
+class Pagination:
+    def __init__(self):
+        pass
+
+    def page_size(self, limit: int | None) -> int:
+        config = current_app.config
+
+        if limit is None:
+            return config["DEFAULT_PAGE_SIZE"]
+
+        return max(1, min(limit, config["MAX_PAGE_SIZE"]))
+
+    def parse_limit(self, limit: str | None) -> int | None:
+        if limit is None:
+            return None
+
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ConversionError(f"Error converting {limit} to int")
+
+        if limit < 1:
+            raise ConversionError(f"Invalid limit {limit}")
+
+        return limit
+
+    def encode_cursor(self, key: tuple | None) -> str | None:
+        if key is None:
+            return None
+
+        values = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in key
+        ]
+
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor: str | None, *types: type) -> tuple | None:
+        # types gives the type of every part of the sort key, e.g.
+        # (datetime, int) for a cursor over (date, id)
+        if cursor is None:
+            return None
+
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+
+            if not isinstance(values, list) or len(values) != len(types):
+                raise ValueError(cursor)
+
+            return tuple(
+                datetime.fromisoformat(value) if type is datetime else type(value)
+                for type, value in zip(types, values)
+            )
+        except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+            raise ConversionError(f"Invalid cursor {cursor}")
+
+    def page(self, rows: list, size: int, key) -> tuple[list, tuple | None]:
+        # Rows are fetched with one extra row to tell whether a next page exists
+        if len(rows) <= size:
+            return rows, None
+
+        rows = rows[:size]
+
+        return rows, key(rows[-1])
+
+pagination = Pagination()
@@ -0,0 +1,143 @@
+import enum
+import logging
+
+from datetime import date
+from decimal import Decimal
+from flask import Flask, Response
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime, Enum, Numeric
+from server.model.tables import Base
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _enum_name(value: enum.Enum) -> str:
+    return value.name
+
+def _converter(column):
+    # The same formats Flask's default JSON provider gives these types, so
+    # responses look the same whichever path built them
+    if isinstance(column.type, Enum):
+        return _enum_name
+    if isinstance(column.type, (DateTime, Date)):
+        return http_date
+    if isinstance(column.type, Numeric):
+        return str
+
+    return None
+
+class Serializer:
+    def __init__(self):
+        # Resolved once per model instead of reflecting over the table and
+        # the instance state for every row
+        self.accessors: dict[type, tuple] = {
+            mapper.class_: self.compile(mapper) for mapper in Base.registry.mappers
+        }
+
+    def compile(self, mapper) -> tuple:
+        return tuple(
+            (attr.key, _converter(attr.columns[0]), attr.deferred)
+            for attr in mapper.column_attrs
+        )
+
+    def init_app(self, app: Flask) -> None:
+        if app.config["JSON_BACKEND"] != "orjson":
+            return
+
+        if orjson is None:
+            logging.warning("orjson is not installed, using the default JSON provider")
+            return
+
+        app.json = OrjsonProvider(app)
+
+    def dump(self, obj: Base, fields: set[str] | None = None) -> dict:
+        # Loaded columns sit in the instance __dict__. Deferred ones that are
+        # missing are left out like Base.to_dict does, anything else missing
+        # (expired) goes through the attribute so the ORM can load it
+        values = obj.__dict__
+        data = {}
+
+        for key, convert, deferred in self.accessors[type(obj)]:
+            if fields is not None and key not in fields:
+                continue
+
+            if key in values:
+                value = values[key]
+            elif deferred:
+                continue
+            else:
+                value = getattr(obj, key)
+
+            if value is not None and convert is not None:
+                value = convert(value)
+
+            data[key] = value
+
+        return data
+
+    def dump_all(self, objs: list[Base], fields: set[str] | None = None) -> list[dict]:
+        return [self.dump(obj, fields) for obj in objs]
+
+def _orjson_default(o):
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, Decimal):
+        return str(o)
+
+    return DefaultJSONProvider.default(o)
+
+def _enum_names(obj):
+    # orjson writes enums by value without ever calling default, so they are
+    # swapped for their names first, the way the serializer writes columns
+    if isinstance(obj, dict):
+        return {key: _enum_names(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_enum_names(value) for value in obj]
+    if isinstance(obj, enum.Enum):
+        return obj.name
+
+    return obj
+
+class OrjsonProvider(DefaultJSONProvider):
+    # Datetimes are passed through to default so they keep Flask's HTTP date
+    # format instead of orjson's ISO 8601
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def options_for(self, indent: bool) -> int:
+        options = self.options
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+
+        return options
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+
+        return orjson.dumps(
+            _enum_names(obj), default = _orjson_default, option = self.options_for(False)).decode()
+
+    def loads(self, s: str | bytes, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+
+        body = orjson.dumps(
+            _enum_names(obj),
+            default = _orjson_default,
+            option = self.options_for(indent) | orjson.OPT_APPEND_NEWLINE
+        )
+
+        return self._app.response_class(body, mimetype = self.mimetype)
+
+serializer = Serializer()
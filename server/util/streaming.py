@@ -0,0 +1,58 @@
+from itertools import islice
+from typing import Iterable
+from flask import Response, current_app, stream_with_context
+from server.exceptions import ConversionError, DeadlineExceededError
+
+class Streaming:
+    def __init__(self):
+        pass
+
+    def parse(self, value: str | None) -> bool:
+        if value is None:
+            return False
+
+        if value.lower() == "true":
+            return True
+        if value.lower() == "false":
+            return False
+
+        raise ConversionError(f"Error converting {value} to bool")
+
+    def response(self, message: str, rows: Iterable[dict]) -> Response:
+        # The same envelope as a page, without next, written a batch of rows
+        # at a time while rows is still being read from the database
+        app = current_app._get_current_object()
+        size = app.config["STREAM_BATCH_SIZE"]
+        dumps = app.json.dumps
+        rows = iter(rows)
+
+        # Read before anything is sent, so a query that fails straight away
+        # still reaches the error handlers and gets its own status
+        first = [dumps(row) for row in islice(rows, size)]
+
+        def chunks():
+            yield f'{{"message":{dumps(message)},"data":['
+
+            try:
+                batch = first
+                separator = ""
+                while batch:
+                    yield separator + ",".join(batch)
+                    separator = ","
+                    batch = [dumps(row) for row in islice(rows, size)]
+            except Exception as e:
+                # The 200 is already sent, so the failure goes in the body.
+                # Clients must check for error, a truncated body never parses
+                app.logger.exception("Streamed response failed")
+                error = "Request timed out" if isinstance(e, DeadlineExceededError) else "Internal server error"
+                yield f'],"error":{dumps(error)}}}\n'
+                return
+            finally:
+                if hasattr(rows, "close"):
+                    rows.close()
+
+            yield "]}\n"
+
+        return app.response_class(stream_with_context(chunks()), mimetype = "application/json")
+
+streaming = Streaming()
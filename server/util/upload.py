@@ -0,0 +1,91 @@
+import hashlib
+import os
+import tempfile
+
+from flask import Flask, Request, current_app
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import cached_property
+from server.exceptions import ConversionError
+from server.util.blob_store import blob_store, sniff
+
+class HashingFile:
+    def __init__(self, directory: str, max_size: int):
+        os.makedirs(directory, exist_ok = True)
+        fd, self.name = tempfile.mkstemp(dir = directory)
+        self.file = os.fdopen(fd, "w+b")
+        self.hash = hashlib.sha256()
+        self.head = b""
+        self.size = 0
+        self.max_size = max_size
+
+    def write(self, data: bytes) -> int:
+        # Checked before anything is written, so a part over the limit stops
+        # the parser while the rest of the body is still unread
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise RequestEntityTooLarge()
+
+        if len(self.head) < 12:
+            self.head += data[:12 - len(self.head)]
+        self.hash.update(data)
+
+        return self.file.write(data)
+
+    def __getattr__(self, name: str):
+        return getattr(self.file, name)
+
+    def digest(self) -> str:
+        return self.hash.hexdigest()
+
+    def close(self) -> None:
+        self.file.close()
+
+        # Gone once the blob store has taken it
+        if os.path.exists(self.name):
+            os.unlink(self.name)
+
+class UploadRequest(Request):
+    @cached_property
+    def uploads(self) -> list[HashingFile]:
+        return []
+
+    def _get_file_stream(
+        self,
+        total_content_length: int | None,
+        content_type: str | None,
+        filename: str | None = None,
+        content_length: int | None = None,
+    ) -> HashingFile:
+        # Every file part goes to disk as it arrives instead of being held
+        # in memory, and is hashed on the way so it is never read back
+        upload = HashingFile(blob_store.temp_dir, current_app.config["UPLOAD_MAX_SIZE"])
+        self.uploads.append(upload)
+
+        return upload
+
+    def close(self) -> None:
+        super().close()
+
+        # Parts the parser gave up on never reach request.files
+        for upload in self.__dict__.get("uploads", ()):
+            upload.close()
+
+class Uploads:
+    def __init__(self):
+        pass
+
+    def init_app(self, app: Flask) -> None:
+        app.request_class = UploadRequest
+
+    def store(self, file: FileStorage) -> str:
+        upload = file.stream
+
+        if sniff(upload.head) == "application/octet-stream":
+            raise ConversionError(f"Error converting {file.filename} to image")
+
+        upload.file.close()
+
+        return blob_store.put_file(upload.name, upload.digest())
+
+uploads = Uploads()
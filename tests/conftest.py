@@ -1,6 +1,8 @@
 import pytest
 
+from contextlib import contextmanager
 from flask import current_app, g 
+from sqlalchemy import event
 from server.model.db import DB
 from server.model.repository.book_repository import BookRepository
 from server.util.extensions import otp_cache, mailer
@@ -11,8 +13,9 @@ from tests.extensions import test_cache
 from server.model.repository.user_account_repository import UserAccountRepository
 
 @pytest.fixture(scope="session")
-def app():
-    return create_app("testing")
+def app(tmp_path_factory):
+    # A fresh blob store per run, so no test sees covers left by an earlier one
+    return create_app("testing", {"BLOB_STORE_PATH": str(tmp_path_factory.mktemp("blobs"))})
 
 @pytest.fixture
 def client(app):
@@ -70,6 +73,34 @@ def client_factory(app):
         return client
     return _get_client
 
+class Statement:
+    def __init__(self, text: str, parameters, cursor: str | None):
+        self.text = text
+        self.parameters = parameters
+        # Named for server-side cursors, None otherwise
+        self.cursor = cursor
+
+@pytest.fixture
+def record_statements():
+    # Collects the statements sent to the database inside the with block, on
+    # the app's engine unless another engine or connection is given. Must be
+    # used inside an app context
+    @contextmanager
+    def record(target = None):
+        target = target if target is not None else DB.get_db().get_engine()
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(Statement(statement, parameters, getattr(cursor, "name", None)))
+
+        event.listen(target, "before_cursor_execute", capture)
+        try:
+            yield statements
+        finally:
+            event.remove(target, "before_cursor_execute", capture)
+
+    return record
+
 @pytest.fixture(scope="session")
 def runner(app):
     return app.test_cli_runner()
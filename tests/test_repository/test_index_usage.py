@@ -0,0 +1,44 @@
+import pytest
+
+from server.model.db import DB
+from server.model.repository.book_return_repository import BookReturnRepository
+from server.model.repository.book_transaction_repository import BookTransactionRepository
+from server.model.repository.fine_repository import FineRepository
+from server.model.repository.user_account_repository import UserAccountRepository
+from server.model.tables import AccountType
+
+### ==========================
+### Repository filters use an index scan
+### ==========================
+
+@pytest.mark.parametrize(("repository", "method", "filters", "index"), (
+    (BookTransactionRepository, "get_transactions", {"user_id": 1}, "ix_book_transaction_user_id_returned"),
+    (BookTransactionRepository, "get_transactions", {"user_id": 1, "returned": False}, "ix_book_transaction_user_id_returned"),
+    (BookTransactionRepository, "get_transactions", {"book_id": 1}, "ix_book_transaction_book_id"),
+    (BookTransactionRepository, "get_transactions", {"book_id": 1, "returned": False}, "uq_book_transaction_book_id_open"),
+    (BookReturnRepository, "get_book_return", {"book_transaction_id": 1}, "ix_book_return_book_transaction_id"),
+    (FineRepository, "get_fine", {"user_id": 1, "paid": False}, "ix_fine_user_id_paid"),
+    (FineRepository, "get_fine", {"transaction_id": 1}, "ix_fine_transaction_id"),
+    (UserAccountRepository, "get_user", {"email": "borrower@email.com", "account_type": AccountType.BORROWER}, "ix_user_account_email_account_type"),
+    (UserAccountRepository, "get_user", {"account_type": AccountType.BORROWER}, "ix_user_account_account_type_account_state"),
+))
+def test_repository_query_uses_index(app, record_statements, repository, method, filters, index):
+    with app.app_context():
+        Session = DB.get_db().get_sessionmaker()
+
+        with Session() as session:
+            # The test tables are tiny, so a sequential scan would otherwise
+            # always win
+            connection = session.connection()
+            connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+            with record_statements(connection) as statements:
+                getattr(repository(session), method)(**filters)
+
+            plan = "\n".join(
+                row[0] for row in connection.exec_driver_sql(
+                    f"EXPLAIN {statements[-1].text}", statements[-1].parameters
+                )
+            )
+
+            assert index in plan
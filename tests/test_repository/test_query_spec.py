@@ -0,0 +1,60 @@
+from sqlalchemy import inspect
+from server.model.db import DB
+from server.model.repository.book_repository import BookRepository
+from server.model.tables import Book, BookCondition
+
+### ==========================
+### BaseRepository.spec
+### ==========================
+
+def test_query_spec_pushes_criteria_into_sql(app):
+    with app.app_context():
+        Session = DB.get_db().get_sessionmaker()
+
+        with Session() as session:
+            book_repo = BookRepository(session)
+            for n in range(6):
+                book_repo.insert_book(
+                    f"query_spec_{n}", "description", "author",
+                    BookCondition.NEW if n % 2 == 0 else BookCondition.WORN
+                )
+            session.flush()
+
+            ids = [book.id for book in book_repo.find(
+                book_repo.spec().like(Book.title, "query_spec_%").order_by(Book.id)
+            )]
+            assert len(ids) == 6
+
+            spec = (
+                book_repo.spec()
+                .in_(Book.id, ids)
+                .range(Book.id, ids[1], ids[5])
+                .eq(Book.condition, BookCondition.NEW)
+                .eq(Book.author, None)
+                .order_by(Book.id.desc())
+            )
+            assert [book.id for book in book_repo.find(spec)] == [ids[4], ids[2]]
+
+            page = book_repo.find(
+                book_repo.spec().in_(Book.id, ids).page((ids[2],), 2, Book.id)
+            )
+            assert [book.id for book in page] == ids[3:5]
+
+            session.expunge_all()
+            book = book_repo.find(book_repo.spec().eq(Book.id, ids[0]).only(Book.title))[0]
+            assert "description" in inspect(book).unloaded
+
+            session.rollback()
+
+def test_get_by_ids_returns_rows_in_id_order(app):
+    with app.app_context():
+        Session = DB.get_db().get_sessionmaker()
+
+        with Session() as session:
+            book_repo = BookRepository(session)
+            ids = [book.id for book in book_repo.find(
+                book_repo.spec().order_by(Book.id).limit(4)
+            )]
+
+            books = book_repo.get_books_by_ids([ids[3], ids[0], -1])
+            assert [book.id for book in books] == [ids[0], ids[3]]
@@ -1,7 +1,12 @@
+import io
 import pytest
+import time
 
 from flask import current_app, g, session
+from PIL import Image
 from tests.test_data import *
+from server.util.blob_store import blob_store
+from server.util.derivatives import derivatives
 from server.util.extensions import mailer as mail
 
 ### ==========================
@@ -165,6 +170,203 @@ def test_get_book_good(client):
 
     current_app.config["book"] = response.json.get("data")[0]
 
+@pytest.mark.parametrize(("query", "error"), (
+    ("limit=HI", "Invalid limit HI"),
+    ("limit=0", "Invalid limit 0"),
+    ("cursor=HI", "Invalid cursor HI"),
+    ("cursor=WyJISSJd", "Invalid cursor WyJISSJd"),
+))
+def test_get_book_page_bad(client, query, error):
+    response = client.get(
+        f"/book?{query}"
+    )
+
+    assert response.json.get("error") == error
+    assert response.status_code == 400
+
+@pytest.mark.parametrize(("query", "keys"), (
+    ("fields=id,title", {"id", "title"}),
+    ("fields=id,borrower_id,transactions", {"id", "transactions"}),
+))
+def test_get_book_fields_good(client, query, keys):
+    response = client.get(
+        f"/book?title=title&{query}"
+    )
+
+    assert set(response.json.get("data")[0]) == keys
+    assert response.status_code == 200
+
+@pytest.mark.parametrize(("query", "error"), (
+    ("fields=password", "Invalid field password"),
+    ("fields=title.id", "Invalid field title.id"),
+))
+def test_get_book_fields_bad(client, query, error):
+    response = client.get(
+        f"/book?{query}"
+    )
+
+    assert response.json.get("error") == error
+    assert response.status_code == 400
+
+@pytest.mark.parametrize(("query", "error"), (
+    ("ids=1,HI", "Invalid book ids 1,HI"),
+    ("ids=", "Invalid book ids "),
+    ("ids=1&fields=transactions", "Invalid field transactions"),
+))
+def test_get_book_ids_bad(client, query, error):
+    response = client.get(
+        f"/book?{query}"
+    )
+
+    assert response.json.get("error") == error
+    assert response.status_code == 400
+
+def test_get_book_ids_good(client):
+    response = client.get(
+        "/book?title=title"
+    )
+    id = response.json.get("data")[0].get("id")
+
+    response = client.get(
+        f"/book?ids={id},-1,{id}&fields=id,title"
+    )
+
+    assert response.json.get("data") == [{"id": id, "title": "title"}]
+    assert response.status_code == 200
+
+    response = client.get(
+        "/book?ids=-1"
+    )
+
+    assert response.json.get("message") == "No book found"
+    assert response.status_code == 200
+
+def test_get_book_stream_good(client):
+    paged = client.get(
+        "/book?title=title"
+    )
+    streamed = client.get(
+        "/book?title=title&stream=true"
+    )
+
+    assert streamed.is_streamed
+    assert streamed.json.get("message") == "Book(s) retrieved"
+    assert streamed.json.get("data") == paged.json.get("data")
+    assert streamed.status_code == 200
+
+def test_get_book_stream_bad(client):
+    response = client.get(
+        "/book?stream=HI"
+    )
+
+    assert response.json.get("error") == "Invalid stream HI"
+    assert response.status_code == 400
+
+def test_get_book_page_good(client):
+    response = client.get(
+        "/book?title=title&limit=1"
+    )
+
+    assert len(response.json.get("data")) == 1
+    assert response.json.get("next") is None
+    assert response.status_code == 200
+
+### ==========================
+### Common - /image
+### ==========================
+
+def test_get_image_good(client, app):
+    with app.app_context():
+        digest = blob_store.put(b"\xff\xd8\xff" + bytes(range(256)))
+
+    response = client.get(f"/image/{digest}")
+
+    assert response.status_code == 200
+    assert response.mimetype == "image/jpeg"
+    assert response.get_data()[:3] == b"\xff\xd8\xff"
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == app.config["IMAGE_MAX_AGE"]
+    assert response.headers["ETag"] == f'"{digest}"'
+    response.close()
+
+    response = client.get(f"/image/{digest}", headers = {"Range": "bytes=0-9"})
+
+    assert response.status_code == 206
+    assert len(response.get_data()) == 10
+    response.close()
+
+    response = client.get(f"/image/{digest}", headers = {"If-None-Match": f'"{digest}"'})
+
+    assert response.status_code == 304
+    response.close()
+
+def test_get_image_size_good(client, app):
+    data = io.BytesIO()
+    Image.new("RGB", (1000, 500), "red").save(data, format = "JPEG")
+    with app.app_context():
+        digest = blob_store.put(data.getvalue())
+
+    # Until the copy is written the original is served, and not cached
+    response = client.get(f"/image/{digest}?size=thumb", headers = {"Accept": "image/webp"})
+
+    assert response.status_code == 200
+    assert response.get_data() == data.getvalue()
+    assert response.cache_control.no_cache
+    response.close()
+
+    future = derivatives.submit(digest)
+    if future is not None:
+        future.result()
+    while derivatives.pending:
+        time.sleep(0.01)
+
+    response = client.get(f"/image/{digest}?size=thumb", headers = {"Accept": "image/webp"})
+
+    assert response.status_code == 200
+    assert response.mimetype == "image/webp"
+    assert len(response.get_data()) < len(data.getvalue())
+    assert response.cache_control.immutable
+    assert "Accept" in response.headers["Vary"]
+    response.close()
+
+    response = client.get(f"/image/{digest}?size=thumb")
+
+    assert response.mimetype == "image/jpeg"
+    response.close()
+
+def test_get_image_size_without_pipeline(client, app, monkeypatch):
+    monkeypatch.setattr(derivatives, "executor", None)
+    with app.app_context():
+        digest = blob_store.put(b"\xff\xd8\xff" + bytes(range(256)))
+
+    response = client.get(f"/image/{digest}?size=thumb")
+
+    # Caching it would keep the full size image under the thumb URL for good
+    assert response.status_code == 200
+    assert response.get_data()[:3] == b"\xff\xd8\xff"
+    assert response.cache_control.no_cache
+    assert not response.cache_control.immutable
+    response.close()
+
+def test_get_image_size_bad(client, app):
+    with app.app_context():
+        digest = blob_store.put(b"\xff\xd8\xff" + bytes(range(256)))
+
+    response = client.get(f"/image/{digest}?size=huge")
+
+    assert response.json.get("error") == "Invalid size huge"
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("hash", (
+    "0" * 64,
+    "HI",
+))
+def test_get_image_bad(client, hash):
+    response = client.get(f"/image/{hash}")
+
+    assert response.json.get("error") == f"Image {hash} not found"
+    assert response.status_code == 404
+
 ### ==========================
 ### Common - /forgot-password
 ### ==========================
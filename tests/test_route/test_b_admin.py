@@ -232,6 +232,81 @@ def test_get_user_by_id_good(client_factory, type):
 
     assert data.get("user").get("account_type").lower() == type
 
+def test_get_user_summary_good(client_factory):
+    client = client_factory("admin")
+
+    response = client.get(
+        f"/admin/users?id={test_cache.get('borrower_id')}&view=summary",
+    )
+
+    assert response.status_code == 200
+
+    data = response.json.get("data")[0]
+    assert data.get("user").get("id") == test_cache.get("borrower_id")
+    assert "password" not in data.get("user")
+    assert "transaction" not in data
+    for key in ("open_loans", "total_loans", "unpaid_fines", "unpaid_amount"):
+        assert key in data
+
+def test_get_user_fields_good(client_factory):
+    client = client_factory("admin")
+
+    response = client.get(
+        f"/admin/users?id={test_cache.get('borrower_id')}&fields=user.id,user.name,fine",
+    )
+
+    assert response.status_code == 200
+
+    data = response.json.get("data")[0]
+    assert set(data) == {"user", "fine"}
+    assert set(data.get("user")) == {"id", "name"}
+
+def test_get_user_fields_bad(client_factory):
+    client = client_factory("admin")
+
+    response = client.get(
+        "/admin/users?fields=user.password",
+    )
+
+    assert response.json.get("error") == "Invalid field user.password"
+    assert response.status_code == 400
+
+def test_get_user_summary_bad(client_factory):
+    client = client_factory("admin")
+
+    response = client.get(
+        "/admin/users?view=test",
+    )
+
+    assert response.json.get("error") == "Invalid view test"
+    assert response.status_code == 400
+
+def test_get_user_stream_good(client_factory):
+    client = client_factory("admin")
+
+    query = f"/admin/users?id={test_cache.get('borrower_id')}"
+    paged = client.get(query)
+    streamed = client.get(f"{query}&stream=true")
+
+    assert streamed.status_code == 200
+    assert streamed.is_streamed
+    assert streamed.json.get("data") == paged.json.get("data")
+    assert "next" not in streamed.json
+
+@pytest.mark.parametrize(("query", "error"), (
+    ("stream=HI", "Invalid stream HI"),
+    ("stream=true&view=summary", "Stream is not supported for the summary view"),
+))
+def test_get_user_stream_bad(client_factory, query, error):
+    client = client_factory("admin")
+
+    response = client.get(
+        f"/admin/users?{query}",
+    )
+
+    assert response.json.get("error") == error
+    assert response.status_code == 400
+
 ### ==========================
 ### Admin - PUT /user
 ### ==========================
@@ -463,3 +538,30 @@ def test_update_setting_good(client_factory):
 
     assert response.json.get("message") == 'Setting updated successfully'
 
+
+
+### ==========================
+### Admin - GET /metrics
+### ==========================
+
+def test_get_metrics_bad_unauthorized(client_factory):
+    client = client_factory("borrower")
+
+    response = client.get(
+        "/admin/metrics"
+    )
+
+    assert response.json.get("error") == "Unauthorized"
+    assert response.status_code == 401
+
+def test_get_metrics_good(client_factory):
+    client = client_factory("admin")
+
+    response = client.get(
+        "/admin/metrics"
+    )
+
+    assert response.json.get("message") == "Metrics retrieved"
+    assert "counters" in response.json.get("data")
+    assert "observations" in response.json.get("data")
+    assert response.status_code == 200
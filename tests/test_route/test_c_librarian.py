@@ -0,0 +1,240 @@
+import io
+import os
+import pytest
+
+from sqlalchemy import event, select
+from server.model.db import DB
+from server.model.repository.book_repository import BookRepository
+from server.model.service.librarian_service import LibrarianService
+from server.model.tables import Book, BookCondition
+from server.util.blob_store import blob_store
+from tests.test_data import *
+
+JPEG = b"\xff\xd8\xff" + bytes(range(256)) * 64
+
+### ==========================
+### Librarian - /book multipart
+### ==========================
+
+def test_add_book_multipart_good(client_factory, app):
+    client = client_factory("librarian")
+
+    response = client.post(
+        "/librarian/book",
+        data = {
+            "title": "Multipart",
+            "description": "Uploaded as a file",
+            "author": "author",
+            "condition": "new",
+            "image": (io.BytesIO(JPEG), "cover.jpg", "image/jpeg"),
+        },
+        content_type = "multipart/form-data"
+    )
+
+    assert response.json.get("message") == "Book added successfully"
+    assert response.status_code == 200
+
+    book_id = response.json["data"]["id"]
+    digest = response.json["data"]["image"]
+    with app.app_context():
+        assert blob_store.read(digest) == JPEG
+        # Nothing left behind once the upload is in the store
+        assert os.listdir(blob_store.temp_dir) == []
+
+    response = client.put(
+        "/librarian/book",
+        data = {
+            "id": str(book_id),
+            "on_loan": "false",
+            "image": (io.BytesIO(b"\x89PNG\r\n\x1a\n" + bytes(64)), "cover.png"),
+        },
+        content_type = "multipart/form-data"
+    )
+
+    assert response.json.get("message") == "Book updated successfully"
+    assert response.status_code == 200
+
+    response = client.delete(f"/librarian/book?book_id={book_id}")
+    assert response.status_code == 200
+
+@pytest.mark.parametrize(("image", "error", "code"), (
+    ((io.BytesIO(b"not an image"), "cover.txt"), "Invalid image", 400),
+    ((io.BytesIO(JPEG * 200), "cover.jpg"), "Request too large", 413),
+))
+def test_add_book_multipart_bad(client_factory, app, monkeypatch, image, error, code):
+    client = client_factory("librarian")
+    monkeypatch.setitem(app.config, "UPLOAD_MAX_SIZE", 1024 * 1024)
+
+    response = client.post(
+        "/librarian/book",
+        data = {
+            "title": "Multipart",
+            "description": "Uploaded as a file",
+            "author": "author",
+            "condition": "new",
+            "image": image,
+        },
+        content_type = "multipart/form-data"
+    )
+
+    assert response.json.get("error") == error
+    assert response.status_code == code
+
+    with app.app_context():
+        assert os.listdir(blob_store.temp_dir) == []
+
+def test_update_book_multipart_bad_on_loan(client_factory):
+    client = client_factory("librarian")
+
+    response = client.put(
+        "/librarian/book",
+        data = {
+            "id": "1",
+            "on_loan": "maybe",
+        },
+        content_type = "multipart/form-data"
+    )
+
+    assert response.json.get("error") == "Invalid on_loan maybe"
+    assert response.status_code == 400
+
+def test_update_book_multipart_unknown_id(client_factory, app):
+    client = client_factory("librarian")
+
+    with app.app_context():
+        before = set(blob_store.backend.digests())
+
+    response = client.put(
+        "/librarian/book",
+        data = {
+            "id": "100000",
+            "image": (io.BytesIO(JPEG + b"\x00"), "cover.jpg", "image/jpeg"),
+        },
+        content_type = "multipart/form-data"
+    )
+
+    assert response.json.get("error") == "Book 100000 does not exist"
+    assert response.status_code == 404
+
+    # The cover of a book that does not exist is never stored
+    with app.app_context():
+        assert set(blob_store.backend.digests()) == before
+        assert os.listdir(blob_store.temp_dir) == []
+
+def test_collect_blobs_command(app, monkeypatch):
+    monkeypatch.setitem(app.config, "BLOB_COLLECT_AFTER", 0)
+
+    with app.app_context():
+        orphan = blob_store.put(JPEG + b"\x01")
+
+    result = app.test_cli_runner().invoke(args = ["collect-blobs"])
+    assert result.exit_code == 0, result.output
+
+    with app.app_context():
+        assert not blob_store.exists(orphan)
+
+        # Covers books still point at are kept
+        with DB.get_db().get_sessionmaker()() as session:
+            referenced = BookRepository(session).get_image_hashes()
+
+        assert referenced
+        assert all(blob_store.exists(digest) for digest in referenced)
+
+### ==========================
+### Librarian - request-scoped session
+### ==========================
+
+@pytest.fixture
+def transactions(app, monkeypatch):
+    # The transactions begun and ended on the primary while requests run
+    monkeypatch.setitem(app.config, "REQUEST_SCOPED_SESSION", True)
+    transactions = {"begin": [], "commit": 0, "rollback": 0}
+
+    def begin(conn):
+        transactions["begin"].append(conn.get_execution_options().get("isolation_level"))
+
+    def commit(conn):
+        transactions["commit"] += 1
+
+    def rollback(conn):
+        transactions["rollback"] += 1
+
+    with app.app_context():
+        engine = DB.get_db().get_engine()
+
+    listeners = (("begin", begin), ("commit", commit), ("rollback", rollback))
+    for name, listener in listeners:
+        event.listen(engine, name, listener)
+
+    yield transactions
+
+    for name, listener in listeners:
+        event.remove(engine, name, listener)
+
+def scoped_book(client) -> int:
+    response = client.post(
+        "/librarian/book",
+        json = {
+            "title": "request_scoped",
+            "description": "description",
+            "author": "author",
+            "condition": "new",
+        }
+    )
+
+    return response.json["data"]["id"]
+
+def book_titles(app, title: str) -> list[str]:
+    with app.app_context():
+        with DB.get_db().get_sessionmaker()() as session:
+            return list(session.execute(select(Book.title).where(Book.title == title)).scalars())
+
+def test_request_scoped_one_transaction(client_factory, app, transactions):
+    client = client_factory("librarian")
+    book_id = scoped_book(client)
+    transactions.update(begin = [], commit = 0, rollback = 0)
+
+    # requires_auth and update_book share the request's transaction
+    response = client.put(
+        "/librarian/book",
+        json = {"id": book_id, "title": "request_scoped_updated"}
+    )
+
+    assert response.status_code == 200
+    assert transactions == {"begin": [None], "commit": 1, "rollback": 0}
+    assert book_titles(app, "request_scoped_updated") == ["request_scoped_updated"]
+
+def test_request_scoped_rollback_only(client_factory, app, transactions, monkeypatch):
+    client = client_factory("librarian")
+    update_book = LibrarianService.update_book
+
+    def add_then_update_book(self, id, new_book):
+        LibrarianService(self.Session).add_book(
+            "request_scoped_rolled_back", "description", "author", BookCondition.NEW, None)
+        return update_book(self, -1, new_book)
+
+    monkeypatch.setattr(LibrarianService, "update_book", add_then_update_book)
+    transactions.update(begin = [], commit = 0, rollback = 0)
+
+    # The view answers 404, but the book added earlier in the request is
+    # rolled back with it
+    response = client.put(
+        "/librarian/book",
+        json = {"id": 1, "title": "request_scoped"}
+    )
+
+    assert response.status_code == 404
+    assert transactions == {"begin": [None], "commit": 0, "rollback": 1}
+    assert book_titles(app, "request_scoped_rolled_back") == []
+
+def test_request_scoped_own_isolation_level(client_factory, app, transactions):
+    client = client_factory("librarian")
+    book_id = scoped_book(client)
+    transactions.update(begin = [], commit = 0, rollback = 0)
+
+    # return_book asks for REPEATABLE READ, so it cannot join the request's
+    # transaction and begins its own
+    response = client.post("/librarian/return-book", json = {"id": book_id})
+
+    assert response.status_code == 200
+    assert transactions["begin"] == [None, "REPEATABLE READ"]
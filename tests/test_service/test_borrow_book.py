@@ -0,0 +1,89 @@
+import random
+import threading
+
+from sqlalchemy import func, select
+from server.exceptions import BookBorrowingError
+from server.model.db import DB
+from server.model.repository.book_repository import BookRepository
+from server.model.service.borrower_service import BorrowerService
+from server.model.tables import BookCondition, BookTransaction
+from tests.extensions import test_cache
+
+def insert_books(app, count: int, title: str) -> list[int]:
+    with app.app_context():
+        Session = DB.get_db().get_sessionmaker()
+
+        with Session.begin() as session:
+            book_repo = BookRepository(session)
+            books = [
+                book_repo.insert_book(title, "description", "author", BookCondition.NEW)
+                for _ in range(count)
+            ]
+            session.flush()
+
+            return [book.id for book in books]
+
+### ==========================
+### BorrowerService.borrow_book
+### ==========================
+
+def test_borrow_book_parallel_borrowers_no_double_loans(app):
+    book_ids = insert_books(app, 10, "borrow_book_stress")
+    user_id = test_cache.get("borrower_id")
+    borrowed: list[list[int]] = []
+    errors: list[Exception] = []
+
+    def borrow(cart: list[int]):
+        with app.app_context():
+            try:
+                BorrowerService(DB.get_db().get_sessionmaker()).borrow_book(user_id, cart)
+                borrowed.append(cart)
+            except BookBorrowingError:
+                pass
+            except Exception as e:
+                errors.append(e)
+
+    # Overlapping carts in random order would deadlock without ordered locks
+    threads = [
+        threading.Thread(target=borrow, args=(random.sample(book_ids, 3),))
+        for _ in range(100)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+    borrowed_ids = [book_id for cart in borrowed for book_id in cart]
+    assert len(borrowed_ids) == len(set(borrowed_ids))
+
+    with app.app_context():
+        Session = DB.get_db().get_sessionmaker()
+
+        with Session() as session:
+            open_loans = session.execute(
+                select(BookTransaction.book_id, func.count())
+                .where(
+                    BookTransaction.book_id.in_(book_ids),
+                    BookTransaction.returned == False
+                )
+                .group_by(BookTransaction.book_id)
+            ).all()
+
+    assert all(count == 1 for _, count in open_loans)
+    assert sorted(book_id for book_id, _ in open_loans) == sorted(borrowed_ids)
+
+def test_borrow_book_statement_count_independent_of_cart_size(app, record_statements):
+    user_id = test_cache.get("borrower_id")
+
+    def count_statements(cart: list[int]) -> int:
+        with app.app_context(), record_statements() as statements:
+            BorrowerService(DB.get_db().get_sessionmaker()).borrow_book(user_id, cart)
+
+        return len(statements)
+
+    small = count_statements(insert_books(app, 1, "borrow_book_small"))
+    large = count_statements(insert_books(app, 50, "borrow_book_large"))
+
+    assert small == large
@@ -0,0 +1,119 @@
+import decimal
+import pytest
+
+from datetime import datetime, timedelta
+from server.model.db import DB
+from server.model.repository.book_repository import BookRepository
+from server.model.repository.book_return_repository import BookReturnRepository
+from server.model.repository.book_transaction_repository import BookTransactionRepository
+from server.model.repository.fine_repository import FineRepository
+from server.model.service.borrower_service import BorrowerService
+from server.model.repository.user_account_repository import UserAccountRepository
+from server.model.tables import AccountType, BookCondition
+from tests.extensions import test_cache
+
+def insert_borrower_with_loans(app, name: str, count: int) -> int:
+    librarian_id = test_cache.get("librarian_id")
+    due = datetime.now() + timedelta(days=7)
+
+    with app.app_context():
+        Session = DB.get_db().get_sessionmaker()
+
+        with Session.begin() as session:
+            user = UserAccountRepository(session).insert_user(
+                name, f"{name}@email.com", "password", AccountType.BORROWER)
+            session.flush()
+            user_id = user.id
+
+            books = [
+                BookRepository(session).insert_book("borrower_reads", "description", "author", BookCondition.NEW)
+                for _ in range(count)
+            ]
+            session.flush()
+
+            transaction_repo = BookTransactionRepository(session)
+            transactions = [
+                transaction_repo.insert_transaction(user_id, book.id, due)
+                for book in books
+            ]
+            session.flush()
+
+            # Every other loan is returned late with a fine, the rest stay open
+            for transaction in transactions[::2]:
+                transaction.returned = True
+                BookReturnRepository(session).insert_book_return(transaction.id, librarian_id)
+                FineRepository(session).insert_fine(
+                    user_id, transaction.id, decimal.Decimal("1.00"), "Late")
+            for transaction in transactions[1::2]:
+                transaction.book.on_loan = True
+
+    return user_id
+
+@pytest.fixture(scope="module")
+def borrowers(app) -> tuple[int, int]:
+    return (
+        insert_borrower_with_loans(app, "borrower_reads_few", 2),
+        insert_borrower_with_loans(app, "borrower_reads_many", 40)
+    )
+
+def count_statements(app, record_statements, method: str, user_id: int, strategy: str) -> tuple[int, list]:
+    with app.app_context(), record_statements() as statements:
+        result = getattr(BorrowerService(DB.get_db().get_sessionmaker()), method)(user_id, strategy)
+
+    return len(statements), result
+
+### ==========================
+### BorrowerService read endpoints
+### ==========================
+
+@pytest.mark.parametrize("strategy", ("joined", "selectin", "subquery"))
+@pytest.mark.parametrize("method", ("get_borrowed_books", "get_borrow_history", "get_fines"))
+def test_borrower_reads_query_count_independent_of_loans(app, record_statements, borrowers, method, strategy):
+    few_id, many_id = borrowers
+
+    few, _ = count_statements(app, record_statements, method, few_id, strategy)
+    many, result = count_statements(app, record_statements, method, many_id, strategy)
+
+    assert few == many
+    assert many <= 4
+
+    if method == "get_fines":
+        fines, books, _ = result
+        assert len(fines) == len(books) == 20
+        assert all(fine.transaction.book_id == book.id for fine, book in zip(fines, books))
+    elif method == "get_borrow_history":
+        result, _ = result
+        assert len(result) == 40
+        assert all(
+            (book_return is not None) == transaction.returned
+            for _, transaction, book_return in result
+        )
+    else:
+        assert len(result) == 20
+        assert all(book.id == transaction.book_id for book, transaction in result)
+
+def test_borrower_reads_reject_unknown_strategy(app):
+    with app.app_context():
+        with pytest.raises(ValueError):
+            BorrowerService(DB.get_db().get_sessionmaker()).get_fines(
+                test_cache.get("borrower_id"), "lazy")
+
+@pytest.mark.parametrize("method", ("get_borrow_history", "get_fines"))
+def test_borrower_reads_keyset_pages_cover_every_row(app, borrowers, method):
+    _, many_id = borrowers
+    seen = []
+    after = None
+
+    with app.app_context():
+        service = BorrowerService(DB.get_db().get_sessionmaker())
+
+        while True:
+            page = getattr(service, method)(many_id, limit = 7, after = after)
+            rows, after = page[0], page[-1]
+            assert len(rows) <= 7
+
+            seen.extend(row[1].id if method == "get_borrow_history" else row.id for row in rows)
+            if after is None:
+                break
+
+    assert len(seen) == len(set(seen)) == (40 if method == "get_borrow_history" else 20)
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+from server.model.db import DB
+from server.model.repository.app_settings_repository import AppSettingsRepository
+from server.model.repository.book_repository import BookRepository
+from server.model.repository.book_transaction_repository import BookTransactionRepository
+from server.model.repository.user_account_repository import UserAccountRepository
+from server.model.service.notification_service import due_date_reminder
+from server.model.tables import AccountType, BookCondition
+from server.util.extensions import mailer
+
+### ==========================
+### due_date_reminder
+### ==========================
+
+def test_due_date_reminder_only_loads_loans_in_window(app, record_statements):
+    email = "due_date_reminder@qread.test"
+
+    with app.app_context():
+        db = DB.get_db()
+        Session = db.get_sessionmaker()
+
+        with Session.begin() as session:
+            before_x = int(AppSettingsRepository(session).get_setting("reminder_x_days_before_due")[0].value)
+
+            user = UserAccountRepository(session).insert_user(
+                "due_date_reminder", email, "password", AccountType.BORROWER)
+            books = [
+                BookRepository(session).insert_book(f"due_in_{days}", "description", "author", BookCondition.NEW)
+                for days in (before_x, before_x + 2, -1)
+            ]
+            session.flush()
+
+            now = datetime.now()
+            for book, days in zip(books, (before_x, before_x + 2, -1)):
+                BookTransactionRepository(session).insert_transaction(
+                    user.id, book.id, now + timedelta(days = days, hours = 1))
+                book.on_loan = True
+
+        with record_statements() as statements, mailer.record_messages() as outbox:
+            due_date_reminder()
+
+    sent = [message for message in outbox if message.recipients == [email]]
+    assert len(sent) == 1
+    assert f"due_in_{before_x} will be due in {before_x} day(s)" in sent[0].body
+
+    # Two settings lookups and one joined query for the loans
+    assert len(statements) == 3
+    assert "book_transaction.due >=" in statements[-1].text
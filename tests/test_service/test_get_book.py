@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+from server.model.db import DB
+from server.model.repository.book_repository import BookRepository
+from server.model.repository.book_transaction_repository import BookTransactionRepository
+from server.model.service.common_service import CommonService
+from server.model.tables import BookCondition
+from server.util.blob_store import blob_store
+from tests.extensions import test_cache
+
+def insert_loaned_books(app, count: int, title: str) -> None:
+    user_id = test_cache.get("borrower_id")
+    due = datetime.now() + timedelta(days=7)
+
+    with app.app_context():
+        Session = DB.get_db().get_sessionmaker()
+
+        with Session.begin() as session:
+            books = [
+                BookRepository(session).insert_book(title, "description", "author", BookCondition.NEW)
+                for _ in range(count)
+            ]
+            session.flush()
+
+            transaction_repo = BookTransactionRepository(session)
+            for book in books:
+                transaction_repo.insert_transaction(user_id, book.id, due).returned = True
+                transaction_repo.insert_transaction(user_id, book.id, due)
+                book.on_loan = True
+
+### ==========================
+### CommonService.get_book
+### ==========================
+
+def test_get_book_query_count_independent_of_catalog_size(app, record_statements):
+    insert_loaned_books(app, 5, "get_book_small")
+    insert_loaned_books(app, 200, "get_book_large")
+
+    def count_statements(title: str) -> int:
+        with app.app_context():
+            with record_statements() as statements:
+                books, borrowers, transactions, _ = CommonService(DB.get_db().get_sessionmaker()).get_book(title = title)
+
+            user_id = test_cache.get("borrower_id")
+            assert all(borrower[0] == user_id for borrower in borrowers)
+            assert all(len(history) == 2 for history in transactions)
+            assert all(
+                history[0][0].id < history[1][0].id and not history[1][0].returned
+                for history in transactions
+            )
+
+            return len(statements)
+
+    assert count_statements("get_book_small") == count_statements("get_book_large")
+
+def test_get_book_page_size_is_capped(app):
+    with app.app_context():
+        service = CommonService(DB.get_db().get_sessionmaker())
+
+        books, _, _, next = service.get_book(title = "get_book_large", limit = 150)
+        assert len(books) == 150 and next == (books[-1].id,)
+
+        app.config["MAX_PAGE_SIZE"], max_page_size = 100, app.config["MAX_PAGE_SIZE"]
+        try:
+            books, _, _, next = service.get_book(title = "get_book_large", limit = 150)
+        finally:
+            app.config["MAX_PAGE_SIZE"] = max_page_size
+        assert len(books) == 100
+
+        books, _, _, next = service.get_book(title = "get_book_large", limit = 150, after = next)
+        assert len(books) == 100 and next is None
+
+def test_get_book_lists_image_hash(app):
+    with app.app_context():
+        books, _, _, _ = CommonService(DB.get_db().get_sessionmaker()).get_book(limit = 500)
+
+    # Covers live in the blob store, a book only carries the hash to fetch it by
+    images = [book.image for book in books if book.image is not None]
+    assert len(images) > 0
+    assert all(blob_store.is_hash(image) for image in images)
+
+def test_get_book_fields_pushed_into_select(app, record_statements):
+    with app.app_context(), record_statements() as statements:
+        books, borrowers, transactions, _ = CommonService(DB.get_db().get_sessionmaker()).get_book(
+            title = "get_book_small", only = {"id", "title"})
+
+    assert len(books) == 5
+    assert all(book.to_dict({"id", "title"}).keys() == {"id", "title"} for book in books)
+    assert borrowers == [''] * 5 and transactions == [[]] * 5
+
+    # Only the book query runs, without the unrequested columns
+    book_queries = [statement.text for statement in statements if "FROM book" in statement.text]
+    assert len(book_queries) == 1
+    assert "book.description" not in book_queries[0]
+    assert not any("book_transaction" in statement.text for statement in statements)
+
+def test_get_books_by_ids_is_one_statement(app, record_statements):
+    with app.app_context():
+        db = DB.get_db()
+        service = CommonService(db.get_sessionmaker())
+        loaned, _, _, _ = service.get_book(title = "get_book_large", limit = 3)
+        with db.get_sessionmaker()() as session:
+            available = BookRepository(session).get_book(on_loan = False, limit = 1)
+
+        ids = [loaned[2].id, available[0].id, -1, loaned[0].id]
+
+        with record_statements() as statements:
+            books, borrowers = service.get_books_by_ids(ids)
+
+    assert [book.id for book in books] == [loaned[2].id, available[0].id, loaned[0].id]
+    user_id = test_cache.get("borrower_id")
+    assert borrowers[0][0] == user_id and borrowers[2][0] == user_id
+    assert borrowers[1] == ''
+
+    selects = [statement.text for statement in statements if statement.text.startswith("SELECT")]
+    assert len(selects) == 1
+    assert "LEFT OUTER JOIN book_transaction" in selects[0]
+    assert "LEFT OUTER JOIN user_account" in selects[0]
@@ -0,0 +1,96 @@
+import decimal
+import pytest
+
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, select
+from server.model.db import DB
+from server.model.repository.book_repository import BookRepository
+from server.model.service.admin_service import AdminService
+from server.model.tables import AccountState, AccountType, BookCondition, BookTransaction, Fine, User
+
+@pytest.fixture(scope="module")
+def bulk_users(app):
+    with app.app_context():
+        Session = DB.get_db().get_sessionmaker()
+
+        with Session.begin() as session:
+            book = BookRepository(session).insert_book("get_users", "description", "author", BookCondition.NEW)
+            session.flush()
+
+            for name, count in (("get_users_few", 3), ("get_users_many", 10000)):
+                session.execute(insert(User), [
+                    {
+                        "name": name,
+                        "email": f"{name}_{n}@email.com",
+                        "password": "password",
+                        "account_type": AccountType.BORROWER,
+                        "account_state": AccountState.ACTIVE
+                    }
+                    for n in range(count)
+                ])
+
+            # Give every user one returned loan with a fine
+            user_ids = session.execute(
+                select(User.id).where(User.name.in_(("get_users_few", "get_users_many")))
+            ).scalars().all()
+            transaction_ids = session.execute(
+                insert(BookTransaction).returning(BookTransaction.id, sort_by_parameter_order=True),
+                [
+                    {"user_id": user_id, "book_id": book.id, "due": datetime.now() + timedelta(days=7), "returned": True}
+                    for user_id in user_ids
+                ]
+            ).scalars().all()
+            session.execute(insert(Fine), [
+                {"user_id": user_id, "transaction_id": transaction_id, "amount": decimal.Decimal("1.00"), "reason": "Late"}
+                for user_id, transaction_id in zip(user_ids, transaction_ids)
+            ])
+
+    yield
+
+    with app.app_context():
+        with Session.begin() as session:
+            session.execute(delete(Fine).where(Fine.user_id.in_(user_ids)))
+            session.execute(delete(BookTransaction).where(BookTransaction.user_id.in_(user_ids)))
+            session.execute(delete(User).where(User.id.in_(user_ids)))
+
+### ==========================
+### AdminService.get_users
+### ==========================
+
+def test_get_users_query_count_independent_of_user_count(app, record_statements, bulk_users):
+    def count_statements(name: str) -> tuple[int, list]:
+        with app.app_context(), record_statements() as statements:
+            result, _ = AdminService(DB.get_db().get_sessionmaker()).get_users(name = name, limit = 10000)
+
+        return len(statements), result
+
+    few, _ = count_statements("get_users_few")
+    many, result = count_statements("get_users_many")
+
+    assert few == many
+    assert len(result) == app.config["MAX_PAGE_SIZE"]
+    assert all(
+        len(transactions) == 1 and len(fines) == 1
+        and transactions[0].user_id == fines[0].user_id == user.id
+        for user, transactions, fines in result
+    )
+
+def test_user_repr_leaves_out_password(app, bulk_users):
+    with app.app_context():
+        result, _ = AdminService(DB.get_db().get_sessionmaker()).get_users(name = "get_users_few")
+
+    # Detached with the deferred password never loaded, so touching it in
+    # repr would raise instead of loading it
+    user = result[0][0]
+    assert "get_users_few" in repr(user)
+    assert "password" not in repr(user)
+
+def test_get_user_summaries_aggregates(app, bulk_users):
+    with app.app_context():
+        result, _ = AdminService(DB.get_db().get_sessionmaker()).get_user_summaries(name = "get_users_few")
+
+    assert len(result) == 3
+    assert all(
+        (open_loans, total_loans, unpaid_fines, unpaid_amount) == (0, 1, 1, decimal.Decimal("1.00"))
+        for _, open_loans, total_loans, unpaid_fines, unpaid_amount in result
+    )
@@ -0,0 +1,69 @@
+import pytest
+import time
+
+from flask import session as user_session
+from sqlalchemy import delete, text
+from server.model import db as db_module
+from server.model.db import DB
+from server.model.repository.book_repository import BookRepository
+from server.model.service.base_service import BaseService
+from server.model.service.transactional_wrapper import transactional
+from server.model.tables import Book, BookCondition
+
+TITLE = "replica_routing_test"
+
+class RoutedService(BaseService):
+    @transactional(read_only = True)
+    def read(self):
+        return self.session.execute(text("SELECT 1")).scalar()
+
+    @transactional
+    def write(self):
+        BookRepository(self.session).insert_book(TITLE, "description", "author", BookCondition.NEW)
+
+@pytest.fixture
+def db(app):
+    # The test database stands in for a replica, on an engine of its own
+    with app.app_context():
+        db = DB({**app.config, "REPLICA_CONNECTION_STRINGS": [app.config["CONNECTION_STRING"]]})
+        yield db
+
+        with db.get_sessionmaker().begin() as session:
+            session.execute(delete(Book).where(Book.title == TITLE))
+
+        for engine in (db.get_engine(), *db.get_replica_engines()):
+            engine.dispose()
+
+def test_replica_routing(app, db, record_statements, monkeypatch):
+    service = RoutedService(db.get_sessionmaker())
+    primary, replica = db.get_engine(), db.get_replica_engines()[0]
+
+    def routed(call) -> str:
+        with record_statements(primary) as on_primary, record_statements(replica) as on_replica:
+            call()
+
+        assert bool(on_primary) != bool(on_replica)
+        return "primary" if on_primary else "replica"
+
+    with app.test_request_context():
+        assert routed(service.read) == "replica"
+        assert routed(service.write) == "primary"
+
+        # The user's own write has not reached the replica yet
+        assert user_session["primary_until"] == pytest.approx(
+            time.time() + app.config["READ_YOUR_WRITES_SECONDS"], abs = 1)
+        assert routed(service.read) == "primary"
+
+        class Later:
+            @staticmethod
+            def time() -> float:
+                return user_session["primary_until"] + 1
+
+        monkeypatch.setattr(db_module, "time", Later)
+        assert routed(service.read) == "replica"
+
+    monkeypatch.undo()
+
+    # Another user's reads were never pinned
+    with app.test_request_context():
+        assert routed(service.read) == "replica"
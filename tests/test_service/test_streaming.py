@@ -0,0 +1,151 @@
+import decimal
+import pytest
+
+from datetime import datetime, timedelta
+from server.model.db import DB
+from server.model.repository.book_repository import BookRepository
+from server.model.repository.book_return_repository import BookReturnRepository
+from server.model.repository.book_transaction_repository import BookTransactionRepository
+from server.model.repository.fine_repository import FineRepository
+from server.model.repository.user_account_repository import UserAccountRepository
+from server.model.service.admin_service import AdminService
+from server.model.service.borrower_service import BorrowerService
+from server.model.service.common_service import CommonService
+from server.model.service.transactional_wrapper import transactional
+from server.model.tables import AccountType, BookCondition
+from tests.extensions import test_cache
+
+LOANS = 120
+BATCH = 50
+
+@pytest.fixture(scope="module")
+def streamer(app) -> int:
+    librarian_id = test_cache.get("librarian_id")
+    due = datetime.now() + timedelta(days=7)
+
+    with app.app_context():
+        Session = DB.get_db().get_sessionmaker()
+
+        with Session.begin() as session:
+            user = UserAccountRepository(session).insert_user(
+                "streamer", "streamer@email.com", "password", AccountType.BORROWER)
+            books = [
+                BookRepository(session).insert_book("stream_reads", "description", "author", BookCondition.NEW)
+                for _ in range(LOANS)
+            ]
+            session.flush()
+
+            transaction_repo = BookTransactionRepository(session)
+            transactions = [
+                transaction_repo.insert_transaction(user.id, book.id, due)
+                for book in books
+            ]
+            session.flush()
+
+            for transaction in transactions[::2]:
+                transaction.returned = True
+                BookReturnRepository(session).insert_book_return(transaction.id, librarian_id)
+                FineRepository(session).insert_fine(
+                    user.id, transaction.id, decimal.Decimal("1.00"), "Late")
+            for transaction in transactions[1::2]:
+                transaction.book.on_loan = True
+
+            user_id = user.id
+
+    app.config["STREAM_BATCH_SIZE"], batch_size = BATCH, app.config["STREAM_BATCH_SIZE"]
+    yield user_id
+    app.config["STREAM_BATCH_SIZE"] = batch_size
+
+
+### ==========================
+### Streaming read methods
+### ==========================
+
+def test_stream_books_matches_get_book(app, record_statements, streamer):
+    with app.app_context():
+        Session = DB.get_db().get_sessionmaker()
+        books, borrowers, transactions, _ = CommonService(Session).get_book(title = "stream_reads", limit = LOANS)
+        expected = [
+            (book.id, borrower, [[transaction.id, name] for transaction, name in history])
+            for book, borrower, history in zip(books, borrowers, transactions)
+        ]
+
+    with app.app_context(), record_statements() as statements:
+        rows = [
+            (book.id, borrower, [[transaction.id, name] for transaction, name in history])
+            for book, borrower, history in CommonService(DB.get_db().get_sessionmaker()).stream_books(title = "stream_reads")
+        ]
+
+    assert rows == expected
+
+    # The books come through a named, server-side cursor, with one history
+    # query per batch rather than per book
+    book_queries = [statement.cursor for statement in statements if statement.text.startswith("SELECT book.id")]
+    history_queries = [statement for statement in statements if "FROM book_transaction" in statement.text]
+    assert len(book_queries) == 1 and book_queries[0] is not None
+    assert len(history_queries) == -(-LOANS // BATCH)
+
+def test_stream_books_is_lazy(app, record_statements, streamer):
+    with app.app_context(), record_statements() as statements:
+        rows = CommonService(DB.get_db().get_sessionmaker()).stream_books(title = "stream_reads")
+        row = next(rows)
+        rows.close()
+
+    assert row[0] is not None
+    assert len([statement for statement in statements if "FROM book_transaction" in statement.text]) == 1
+
+def test_stream_borrower_reads_match_pages(app, streamer):
+    with app.app_context():
+        service = BorrowerService(DB.get_db().get_sessionmaker())
+
+        history, _ = service.get_borrow_history(streamer, limit = LOANS)
+        streamed = list(service.stream_borrow_history(streamer))
+        assert [
+            (book.id, transaction.id, book_return.id if book_return else None)
+            for book, transaction, book_return in streamed
+        ] == [
+            (book.id, transaction.id, book_return.id if book_return else None)
+            for book, transaction, book_return in history
+        ]
+
+        fines, books, _ = service.get_fines(streamer, limit = LOANS)
+        streamed = list(service.stream_fines(streamer))
+        assert [(fine.id, book.id) for fine, book in streamed] == [
+            (fine.id, book.id) for fine, book in zip(fines, books)
+        ]
+        assert len(streamed) == LOANS // 2
+
+def test_stream_users_matches_get_users(app, streamer):
+    with app.app_context():
+        service = AdminService(DB.get_db().get_sessionmaker())
+
+        result, _ = service.get_users(id = streamer)
+        streamed = list(service.stream_users(id = streamer))
+
+    assert len(streamed) == 1
+    assert streamed[0][0].id == result[0][0].id
+    assert [transaction.id for transaction in streamed[0][1]] == [transaction.id for transaction in result[0][1]]
+    assert [fine.id for fine in streamed[0][2]] == [fine.id for fine in result[0][2]]
+
+def test_stream_restores_service_session(app, streamer):
+    with app.app_context():
+        Session = DB.get_db().get_sessionmaker()
+        service = BorrowerService(Session)
+
+        with Session() as session:
+            service.session = session
+            streamed = list(service.stream_fines(streamer))
+
+            assert len(streamed) == LOANS // 2
+            assert service.session is session
+
+        rows = service.stream_fines(streamer)
+        next(rows)
+        rows.close()
+        assert service.session is session
+
+def test_streaming_methods_must_be_read_only():
+    with pytest.raises(ValueError):
+        @transactional
+        def write_stream(self):
+            yield
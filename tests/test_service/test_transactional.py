@@ -0,0 +1,205 @@
+import pytest
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.exc import OperationalError
+from server.exceptions import DatabaseError
+from server.model.db import DB
+from server.model.repository.book_repository import BookRepository
+from server.model.service.base_service import BaseService
+from server.model.service.transactional_wrapper import Propagation, transactional
+from server.model.tables import Book, BookCondition
+from server.util.metrics import metrics
+
+TITLE = "transactional_test"
+
+class OuterError(Exception):
+    pass
+
+class InnerService(BaseService):
+    @transactional
+    def add(self, title: str):
+        BookRepository(self.session).insert_book(title, "description", "author", BookCondition.NEW)
+        self.session.flush()
+        return self.session
+
+    @transactional(propagation = Propagation.REQUIRES_NEW)
+    def add_new(self, title: str):
+        return self.add(title)
+
+    @transactional(propagation = Propagation.NESTED)
+    def add_then_fail(self, title: str):
+        self.add(title)
+        self.session.execute(text("SELECT 1 / 0"))
+
+class OuterService(BaseService):
+    @transactional
+    def add_then_fail(self, call: str):
+        BookRepository(self.session).insert_book(f"{TITLE}_outer", "description", "author", BookCondition.NEW)
+        inner_session = getattr(InnerService(self.Session), call)(f"{TITLE}_inner")
+        self.joined = inner_session is self.session
+        raise OuterError()
+
+    @transactional
+    def add_and_recover(self):
+        BookRepository(self.session).insert_book(f"{TITLE}_outer", "description", "author", BookCondition.NEW)
+
+        try:
+            InnerService(self.Session).add_then_fail(f"{TITLE}_inner")
+        except DatabaseError:
+            pass
+
+        # The savepoint is gone, the outer transaction carries on
+        self.session.execute(text("SELECT 1"))
+
+class ReadService(BaseService):
+    @transactional(read_only = True)
+    def read(self):
+        return self.session.execute(text("SELECT 1")).scalar()
+
+    @transactional(read_only = True)
+    def write(self):
+        self.session.execute(text("UPDATE book SET title = title WHERE id = -1"))
+
+    @transactional(read_only = True)
+    def read_then_add(self):
+        inner_session = InnerService(self.Session).add(f"{TITLE}_inner")
+        self.joined = inner_session is self.session
+
+class PgError(Exception):
+    def __init__(self, pgcode: str):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+class FailingService(BaseService):
+    def __init__(self, Session, failures: int, pgcode: str):
+        super().__init__(Session)
+        self.failures = failures
+        self.pgcode = pgcode
+        self.calls = 0
+
+    @transactional
+    def run(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OperationalError("SELECT 1", {}, PgError(self.pgcode))
+        return self.calls
+
+@pytest.fixture
+def Session(app):
+    with app.app_context():
+        Session = DB.get_db().get_sessionmaker()
+        yield Session
+
+        with Session.begin() as session:
+            session.execute(delete(Book).where(Book.title.like(f"{TITLE}%")))
+
+def titles(Session) -> list[str]:
+    with Session() as session:
+        return sorted(session.execute(
+            select(Book.title).where(Book.title.like(f"{TITLE}%"))).scalars())
+
+### ==========================
+### Propagation
+### ==========================
+
+def test_required_joins_outer_transaction(Session):
+    service = OuterService(Session)
+
+    with pytest.raises(OuterError):
+        service.add_then_fail("add")
+
+    # The inner write went down with the outer transaction it joined
+    assert service.joined
+    assert titles(Session) == []
+
+def test_requires_new_commits_on_its_own(Session):
+    service = OuterService(Session)
+
+    with pytest.raises(OuterError):
+        service.add_then_fail("add_new")
+
+    assert not service.joined
+    assert titles(Session) == [f"{TITLE}_inner"]
+
+def test_nested_rolls_back_to_savepoint(Session):
+    OuterService(Session).add_and_recover()
+
+    assert titles(Session) == [f"{TITLE}_outer"]
+
+def test_nested_error_outside_transaction(Session):
+    with pytest.raises(DatabaseError):
+        InnerService(Session).add_then_fail(f"{TITLE}_inner")
+
+    assert titles(Session) == []
+
+### ==========================
+### Read only
+### ==========================
+
+def test_read_only_sets_transaction_read_only(Session, record_statements):
+    with record_statements() as statements:
+        assert ReadService(Session).read() == 1
+
+    assert [statement.text for statement in statements] == ["SET TRANSACTION READ ONLY", "SELECT 1"]
+
+def test_read_only_rejects_writes(Session):
+    with pytest.raises(DatabaseError):
+        ReadService(Session).write()
+
+def test_write_from_read_only_begins_its_own(Session, record_statements):
+    service = ReadService(Session)
+
+    with record_statements() as statements:
+        service.read_then_add()
+
+    assert not service.joined
+    assert titles(Session) == [f"{TITLE}_inner"]
+    assert [statement.text for statement in statements].count("SET TRANSACTION READ ONLY") == 1
+
+### ==========================
+### Retries
+### ==========================
+
+def counters() -> dict:
+    counters = metrics.snapshot()["counters"]
+    return {
+        name: counters.get(name, 0)
+        for name in ("transaction_retries", "transaction_retries_exhausted", "transaction_retries.FailingService.run")
+    }
+
+@pytest.mark.parametrize("pgcode", ("40001", "40P01"))
+def test_retries_until_success(Session, pgcode):
+    service = FailingService(Session, 2, pgcode)
+    before = counters()
+
+    assert service.run() == 3
+    assert service.calls == 3
+
+    after = counters()
+    assert after["transaction_retries"] - before["transaction_retries"] == 2
+    assert after["transaction_retries.FailingService.run"] - before["transaction_retries.FailingService.run"] == 2
+    assert after["transaction_retries_exhausted"] == before["transaction_retries_exhausted"]
+
+def test_retries_exhausted(app, Session, monkeypatch):
+    monkeypatch.setitem(app.config, "TRANSACTION_MAX_RETRIES", 2)
+    service = FailingService(Session, 10, "40001")
+    before = counters()
+
+    with pytest.raises(DatabaseError):
+        service.run()
+
+    assert service.calls == 3
+
+    after = counters()
+    assert after["transaction_retries"] - before["transaction_retries"] == 2
+    assert after["transaction_retries_exhausted"] - before["transaction_retries_exhausted"] == 1
+
+def test_other_errors_are_not_retried(Session):
+    service = FailingService(Session, 1, "23505")
+    before = counters()
+
+    with pytest.raises(DatabaseError):
+        service.run()
+
+    assert service.calls == 1
+    assert counters() == before
@@ -0,0 +1,75 @@
+import os
+import pytest
+
+from server.exceptions import ConversionError
+from server.util.blob_store import BlobStore, LocalBlobStore
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+### ==========================
+### LocalBlobStore
+### ==========================
+
+def test_put_is_content_addressed(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+
+    digest = store.put(PNG)
+    assert store.put(PNG) == digest
+    assert store.path(digest) == os.path.join(str(tmp_path), digest[:2], digest[2:4], digest)
+    assert store.read(digest) == PNG
+    assert store.mimetype(digest) == "image/png"
+
+    # Only the one file, no temporary files left behind
+    assert os.listdir(os.path.dirname(store.path(digest))) == [digest]
+
+def test_put_file_moves_into_place(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    digest = store.put(PNG)
+
+    os.makedirs(store.temp_dir)
+    for _ in range(2):
+        temp = os.path.join(store.temp_dir, "upload")
+        with open(temp, "wb") as file:
+            file.write(PNG)
+
+        # A second copy of stored content is dropped
+        assert store.put_file(temp, digest) == digest
+        assert not os.path.exists(temp)
+        os.unlink(store.path(digest))
+
+def test_collect_unreferenced(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    kept = store.put(PNG)
+    orphan = store.put(PNG + b"\x00")
+    recent = store.put(PNG + b"\x01")
+
+    os.makedirs(store.temp_dir)
+    temp = os.path.join(store.temp_dir, "upload")
+    open(temp, "wb").close()
+    for path in (store.path(kept), store.path(orphan), temp):
+        os.utime(path, (0, 0))
+
+    assert sorted(store.digests()) == sorted([kept, orphan, recent])
+    assert store.collect({kept}, 100) == [orphan]
+    assert sorted(store.digests()) == sorted([kept, recent])
+    assert os.listdir(store.temp_dir) == []
+
+    # Storing the content again restarts its grace period
+    os.utime(store.path(recent), (0, 0))
+    store.put(PNG + b"\x01")
+    assert store.collect({kept}, 100) == []
+
+@pytest.mark.parametrize("value", (
+    "image/jpeg;base64,AAAA",
+    "data:image/jpeg,AAAA",
+    "data:image/jpeg;base64,A*AA",
+))
+def test_decode_data_url_bad(value):
+    with pytest.raises(ConversionError):
+        BlobStore.decode_data_url(value)
+
+def test_data_url_round_trip():
+    value = BlobStore.to_data_url(PNG, "image/png")
+
+    assert value.startswith("data:image/png;base64,")
+    assert BlobStore.decode_data_url(value) == PNG
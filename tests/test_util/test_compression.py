@@ -0,0 +1,102 @@
+import brotli
+import gzip
+import json
+import pytest
+import zstandard
+
+from werkzeug.datastructures import Accept
+from server.util.compression import compression
+from server.util.metrics import metrics
+
+@pytest.fixture
+def min_size(app):
+    def set_min_size(size: int) -> None:
+        app.config["COMPRESSION_MIN_SIZE"] = size
+
+    original = app.config["COMPRESSION_MIN_SIZE"]
+    yield set_min_size
+    app.config["COMPRESSION_MIN_SIZE"] = original
+
+### ==========================
+### Compression.negotiate
+### ==========================
+
+@pytest.mark.parametrize(("accept", "expected"), (
+    ([("gzip", 1)], "gzip"),
+    ([("gzip", 0)], None),
+    ([("*", 1)], "gzip"),
+    ([("deflate", 1)], None),
+    ([], None),
+))
+def test_negotiate_gzip(accept, expected):
+    assert compression.negotiate(Accept(accept), ["gzip"]) == expected
+
+def test_negotiate_prefers_server_order():
+    accept = Accept([("gzip", 1), ("br", 1), ("zstd", 1)])
+
+    assert compression.negotiate(accept, ["zstd", "br", "gzip"]) == "zstd"
+    assert compression.negotiate(accept, ["br", "gzip"]) == "br"
+
+def test_negotiate_prefers_client_quality():
+    compression.encoders["test"] = compression.encoders["gzip"]
+    try:
+        accept = Accept([("gzip", 1), ("test", 0.5)])
+        assert compression.negotiate(accept, ["test", "gzip"]) == "gzip"
+
+        accept = Accept([("gzip", 1), ("test", 1)])
+        assert compression.negotiate(accept, ["test", "gzip"]) == "test"
+    finally:
+        del compression.encoders["test"]
+
+### ==========================
+### Compressed responses
+### ==========================
+
+def test_gzip_response(client, min_size):
+    min_size(0)
+    plain = client.get("/book?title=title")
+    before = metrics.snapshot()["counters"].get("compression.responses.gzip", 0)
+
+    response = client.get("/book?title=title", headers = {"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.get_data())) == plain.json
+    assert metrics.snapshot()["counters"]["compression.responses.gzip"] == before + 1
+    assert "compression.ratio" in metrics.snapshot()["observations"]
+
+def test_small_response_not_compressed(client, min_size):
+    min_size(1_000_000)
+
+    response = client.get("/book?title=title", headers = {"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.json.get("message") == "Book(s) retrieved"
+
+def test_gzip_streamed_response(client, min_size):
+    min_size(1_000_000)
+    plain = client.get("/book?title=title&stream=true")
+
+    response = client.get(
+        "/book?title=title&stream=true", headers = {"Accept-Encoding": "gzip"})
+
+    assert response.is_streamed
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert json.loads(gzip.decompress(response.get_data())) == plain.json
+
+@pytest.mark.parametrize(("encoding", "decompress"), (
+    ("br", brotli.decompress),
+    ("zstd", lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)),
+))
+@pytest.mark.parametrize("stream", ("false", "true"))
+def test_encoded_response(client, min_size, encoding, decompress, stream):
+    min_size(0)
+    plain = client.get(f"/book?title=title&stream={stream}")
+
+    response = client.get(
+        f"/book?title=title&stream={stream}", headers = {"Accept-Encoding": encoding})
+
+    assert response.headers["Content-Encoding"] == encoding
+    assert json.loads(decompress(response.get_data())) == plain.json
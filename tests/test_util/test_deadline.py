@@ -0,0 +1,101 @@
+import pytest
+import re
+import smtplib
+import time
+
+from sqlalchemy import text
+from server.exceptions import DeadlineExceededError
+from server.model.db import DB
+from server.model.repository.book_transaction_repository import BookTransactionRepository
+from server.model.service.base_service import BaseService
+from server.model.service.transactional_wrapper import transactional
+from server.util.deadline import deadline
+from server.util.mailer import mailer
+
+class SleepService(BaseService):
+    @transactional(read_only = True)
+    def sleep(self, seconds: float):
+        self.session.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": seconds})
+
+def statement_timeout(statements) -> int | None:
+    for statement in statements:
+        match = re.fullmatch(r"SET LOCAL statement_timeout = (\d+)", statement.text)
+        if match is not None:
+            return int(match.group(1))
+
+    return None
+
+### ==========================
+### Database
+### ==========================
+
+def test_statement_timeout_is_time_left(app, record_statements):
+    with app.test_request_context():
+        service = SleepService(DB.get_db().get_sessionmaker())
+
+        deadline.start(2)
+        with record_statements() as statements:
+            service.sleep(0)
+
+        assert 1000 < statement_timeout(statements) <= 2000
+
+        # Without a deadline the server default is left alone
+        deadline.start(None)
+        with record_statements() as statements:
+            service.sleep(0)
+
+        assert statement_timeout(statements) is None
+
+def test_statement_timeout_is_deadline_exceeded(app):
+    with app.test_request_context():
+        service = SleepService(DB.get_db().get_sessionmaker())
+
+        deadline.start(0.2)
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceededError):
+            service.sleep(5)
+
+        assert time.monotonic() - started < 2
+
+        # Nothing is sent once the deadline has passed
+        with pytest.raises(DeadlineExceededError):
+            service.sleep(0)
+
+def test_route_deadline_exceeded(app, client_factory, monkeypatch):
+    client = client_factory("borrower")
+    get_transactions = BookTransactionRepository.get_transactions
+
+    def slow_get_transactions(self, *args, **kwargs):
+        self.session.execute(text("SELECT pg_sleep(5)"))
+        return get_transactions(self, *args, **kwargs)
+
+    monkeypatch.setattr(BookTransactionRepository, "get_transactions", slow_get_transactions)
+    monkeypatch.setitem(app.config["BLUEPRINT_TIMEOUTS"], "borrower", 0.5)
+
+    response = client.get("/borrower/borrowed-books")
+
+    assert response.json == {"error": "Request timed out"}
+    assert response.status_code == 504
+
+### ==========================
+### SMTP
+### ==========================
+
+def test_smtp_timeout(app, monkeypatch):
+    timeouts = []
+
+    class SlowSMTP:
+        def __init__(self, host, port, timeout):
+            timeouts.append(timeout)
+            raise TimeoutError()
+
+    monkeypatch.setattr(smtplib, "SMTP", SlowSMTP)
+    monkeypatch.setattr(app.extensions["mail"], "suppress", False)
+
+    with app.test_request_context():
+        deadline.start(3)
+
+        with pytest.raises(DeadlineExceededError):
+            mailer.send_otp("deadline@email.com", "123456")
+
+        assert 2 < timeouts[0] <= 3
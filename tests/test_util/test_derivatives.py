@@ -0,0 +1,103 @@
+import io
+import os
+import pytest
+import threading
+
+from flask import Flask
+from PIL import Image
+from werkzeug.datastructures import MIMEAccept
+from server.exceptions import ConversionError
+from server.util import derivatives as derivatives_module
+from server.util.blob_store import blob_store
+from server.util.derivatives import Derivatives
+
+def make_derivatives(tmp_path) -> Derivatives:
+    app = Flask(__name__)
+    app.config.update(
+        IMAGE_SIZES = {"thumb": 16, "medium": 48},
+        IMAGE_DERIVATIVE_PATH = str(tmp_path),
+        IMAGE_DERIVATIVE_WORKERS = 1,
+    )
+
+    derivatives = Derivatives()
+    derivatives.init_app(app)
+
+    return derivatives
+
+def test_parse_size(tmp_path):
+    derivatives = make_derivatives(tmp_path)
+
+    assert derivatives.parse_size(None) is None
+    assert derivatives.parse_size("original") is None
+    assert derivatives.parse_size("thumb") == "thumb"
+
+    with pytest.raises(ConversionError):
+        derivatives.parse_size("huge")
+
+def test_without_pillow(tmp_path, monkeypatch):
+    monkeypatch.setattr(derivatives_module, "Image", None)
+    derivatives = make_derivatives(tmp_path)
+
+    assert not derivatives.enabled
+    assert derivatives.submit("0" * 64) is None
+
+def test_generate_and_select(app, tmp_path):
+    derivatives = make_derivatives(tmp_path)
+
+    data = io.BytesIO()
+    Image.new("RGB", (200, 100), "red").save(data, format = "JPEG")
+    with app.app_context():
+        digest = blob_store.put(data.getvalue())
+
+    derivatives.submit(digest).result()
+
+    path, mimetype = derivatives.select(digest, "thumb", MIMEAccept([("image/jpeg", 1)]))
+    assert mimetype == "image/jpeg"
+    with Image.open(path) as image:
+        # Fitted into the box, keeping the aspect ratio
+        assert image.size == (16, 8)
+
+    if "webp" in derivatives.formats:
+        path, mimetype = derivatives.select(digest, "medium", MIMEAccept([("image/webp", 1)]))
+        assert mimetype == "image/webp"
+        assert os.path.getsize(path) < len(data.getvalue())
+
+    # */* alone does not get WebP
+    _, mimetype = derivatives.select(digest, "thumb", MIMEAccept([("*/*", 1)]))
+    assert mimetype == "image/jpeg"
+
+def test_select_miss(app, tmp_path):
+    derivatives = make_derivatives(tmp_path)
+
+    # Not an image, so generating fails, is logged and nothing is cached
+    with app.app_context():
+        digest = blob_store.put(b"not an image")
+
+    assert derivatives.select(digest, "thumb", MIMEAccept([("image/jpeg", 1)])) is None
+
+    derivatives.executor.shutdown(wait = True)
+    assert not os.path.exists(derivatives.path(digest, "thumb", "jpeg"))
+
+    # The failure is remembered rather than retried on every request
+    assert os.path.exists(derivatives.failed_path(digest))
+    assert not derivatives.pending
+    assert derivatives.submit(digest) is None
+
+def test_submit_once_while_pending(app, tmp_path):
+    derivatives = make_derivatives(tmp_path)
+
+    with app.app_context():
+        digest = blob_store.put(b"not an image either")
+
+    # Keeps the only worker busy so the job stays queued
+    release = threading.Event()
+    derivatives.executor.submit(release.wait)
+
+    future = derivatives.submit(digest)
+    assert future is not None
+    assert derivatives.submit(digest) is None
+    assert derivatives.pending == {digest}
+
+    release.set()
+    future.result()
+    assert not derivatives.pending
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+from server.model.tables import Book, BookCondition, BookTransaction, Fine, User
+from server.util.serializer import serializer
+
+ROWS = 100
+
+def make_rows() -> tuple[list[Book], list[BookTransaction]]:
+    now = datetime.now(timezone.utc)
+    books = [
+        Book(id = n, title = f"title {n}", description = "description", author = "author",
+             condition = BookCondition.GOOD, on_loan = n % 2 == 0)
+        for n in range(ROWS)
+    ]
+    transactions = [
+        BookTransaction(id = n, user_id = n % 50, book_id = n, date = now,
+                        due = now + timedelta(days = 14), returned = False, extended = False)
+        for n in range(ROWS)
+    ]
+
+    return books, transactions
+
+### ==========================
+### Serializer.dump
+### ==========================
+
+def test_serializer_matches_to_dict(app):
+    books, transactions = make_rows()
+    fine = Fine(id = 1, user_id = 1, transaction_id = 1, reason = "late",
+                amount = Decimal("1.50"), date = datetime.now(timezone.utc), paid = False)
+
+    with app.app_context():
+        default = DefaultJSONProvider(app)
+
+        for rows in (books, transactions, [fine]):
+            expected = default.loads(default.dumps([row.to_dict() for row in rows]))
+            assert app.json.loads(app.json.dumps(serializer.dump_all(rows))) == expected
+
+        assert serializer.dump(books[0], {"id", "condition"}) == {"id": 0, "condition": "GOOD"}
+        assert "password" not in serializer.dump(User(id = 1, name = "name"))
+
+def test_orjson_provider_writes_enum_names(app):
+    with app.app_context():
+        assert app.json.loads(app.json.dumps(BookCondition.GOOD)) == "GOOD"
+        assert app.json.loads(app.json.dumps({"conditions": [BookCondition.NEW, (BookCondition.WORN,)]})) == {
+            "conditions": ["NEW", ["WORN"]]
+        }
+
+        with app.test_request_context():
+            response = app.json.response({"condition": BookCondition.FAIR})
+
+        assert response.json == {"condition": "FAIR"}
@@ -0,0 +1,42 @@
+import json
+import pytest
+
+from server.exceptions import DatabaseError, DeadlineExceededError
+from server.util.streaming import streaming
+
+def rows(count: int, error: Exception | None = None):
+    for i in range(count):
+        yield {"id": i}
+
+    if error is not None:
+        raise error
+
+@pytest.fixture
+def batch_size(app, monkeypatch):
+    monkeypatch.setitem(app.config, "STREAM_BATCH_SIZE", 2)
+
+def test_response(app, batch_size):
+    with app.test_request_context():
+        response = streaming.response("Rows", rows(5))
+        body = json.loads(response.get_data())
+
+    assert body == {"message": "Rows", "data": [{"id": i} for i in range(5)]}
+
+def test_response_fails_before_first_batch(app, batch_size):
+    # Nothing is sent yet, so the error handlers still pick the status
+    with app.test_request_context():
+        with pytest.raises(DeadlineExceededError):
+            streaming.response("Rows", rows(1, DeadlineExceededError()))
+
+@pytest.mark.parametrize(("error", "message"), (
+    (DatabaseError(), "Internal server error"),
+    (DeadlineExceededError(), "Request timed out"),
+    (TypeError(), "Internal server error"),
+))
+def test_response_fails_mid_stream(app, batch_size, error, message):
+    with app.test_request_context():
+        response = streaming.response("Rows", rows(3, error))
+        body = json.loads(response.get_data())
+
+    assert body["data"] == [{"id": 0}, {"id": 1}]
+    assert body["error"] == message
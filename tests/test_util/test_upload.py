@@ -0,0 +1,33 @@
+import hashlib
+import os
+import pytest
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from server.util.upload import HashingFile
+
+def test_hashing_file(tmp_path):
+    upload = HashingFile(str(tmp_path), 1024)
+
+    for chunk in (b"\xff\xd8", b"\xff" + bytes(100), bytes(100)):
+        upload.write(chunk)
+    upload.seek(0)
+
+    data = b"\xff\xd8\xff" + bytes(200)
+    assert upload.read() == data
+    assert upload.digest() == hashlib.sha256(data).hexdigest()
+    assert upload.head == data[:12]
+
+    upload.close()
+    assert os.listdir(str(tmp_path)) == []
+
+def test_hashing_file_too_large(tmp_path):
+    upload = HashingFile(str(tmp_path), 1024)
+    upload.write(bytes(1024))
+
+    with pytest.raises(RequestEntityTooLarge):
+        upload.write(b"\x00")
+
+    # Nothing past the limit reaches the disk
+    upload.flush()
+    assert os.path.getsize(upload.name) == 1024
+    upload.close()